@@ -0,0 +1,110 @@
+"""ローカル用のフェイク Gemini API サーバー
+
+gemini_threejs.py を実 API を使わずに動かすためのもの。
+generateContent / streamGenerateContent に固定の応答を返し、--delay で応答時間を模擬できる
+（並列に投げたツール呼び出しが重なって進むかの確認用）。ストリーミングでは --chunk-delay 間隔で
+1行ずつ送る。
+
+Usage:
+    uv run mcp_servers/fake_gemini.py --port 8765 --delay 2 --chunk-delay 0.5
+    GEMINI_BASE_URL=http://127.0.0.1:8765 GEMINI_API_KEY=dummy uv run mcp_servers/gemini_threejs.py
+"""
+
+import argparse
+import base64
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 1x1 の透明PNG（画像生成の応答用）
+TINY_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+GENERATE_RE = re.compile(r"/models/(?P<model>[^/:]+):(?P<method>generateContent|streamGenerateContent)$")
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive（クライアントの接続再利用を確認できるように）
+    disable_nagle_algorithm = True  # keep-alive 時にヘッダーと本文の送信が遅延しないように
+    delay = 0.0
+    chunk_delay = 0.0
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        match = GENERATE_RE.search(path)
+        if not match:
+            self.send_json(404, {"error": {"code": 404, "message": f"unknown path: {path}", "status": "NOT_FOUND"}})
+            return
+
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(self.delay)
+
+        model = match.group("model")
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = f"[fake {model}] {len(prompt)} chars received\n" + "".join(
+            f"// line {n}\n" for n in range(1, 6)
+        )
+        if match.group("method") == "streamGenerateContent":
+            self.send_stream(model, text.splitlines(keepends=True))
+            return
+
+        parts = [{"text": text}]
+        if "IMAGE" in body.get("generationConfig", {}).get("responseModalities", []):
+            parts.append({"inlineData": {"mimeType": "image/png", "data": base64.b64encode(TINY_PNG).decode()}})
+        self.send_json(200, {
+            "candidates": [{"content": {"role": "model", "parts": parts}, "finishReason": "STOP"}],
+            "modelVersion": model,
+        })
+
+    def send_stream(self, model: str, chunks: list[str]):
+        """SSE（alt=sse）でチャンクを順に送る"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(self.chunk_delay)
+            candidate = {"content": {"role": "model", "parts": [{"text": chunk}]}}
+            if i == len(chunks) - 1:
+                candidate["finishReason"] = "STOP"
+            event = {"candidates": [candidate], "modelVersion": model}
+            self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+
+    def send_json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass  # リクエストごとのログは出さない
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini API server for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="応答までの待ち時間（秒）")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="ストリーミング時のチャンク間隔（秒）")
+    args = parser.parse_args()
+
+    FakeGeminiHandler.delay = args.delay
+    FakeGeminiHandler.chunk_delay = args.chunk_delay
+    server = ThreadingHTTPServer((args.host, args.port), FakeGeminiHandler)
+    print(f"Fake Gemini API: http://{args.host}:{args.port} (delay {args.delay}s)")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,16 @@ Usage:
     uv run mcp_servers/gemini_threejs.py
 """
 
-from mcp.server.fastmcp import FastMCP
-import google.generativeai as genai
+from mcp.server.fastmcp import Context, FastMCP
+from google import genai
+from google.genai import types
+import asyncio
+import hashlib
 import os
 import json
+import sqlite3
+import threading
+import time
 import base64
 from pathlib import Path
 from datetime import datetime
@@ -33,7 +39,6 @@ if not GENAI_API_KEY:
         "Set it in .env file or as environment variable."
     )
 
-genai.configure(api_key=GENAI_API_KEY)
 mcp = FastMCP("Gemini-ThreeJS-Assistant")
 
 # 利用可能なモデル
@@ -64,9 +69,49 @@ MODEL_COSTS = {
 DEFAULT_MODEL = "flash"
 MONTHLY_BUDGET = 1000  # 円
 REQUEST_TIMEOUT_SECONDS = int(os.getenv("GEMINI_REQUEST_TIMEOUT", "120"))
+# モデルごとの同時リクエスト数の上限（これを超えた呼び出しは待機する）
+MAX_CONCURRENT_REQUESTS = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+# APIエンドポイントの差し替え（ローカルのフェイクサーバーでのテスト用。通常は未設定）
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+# 使用量記録（呼び出しごとに追記する台帳 + 月・モデル別の集計）
+USAGE_FILE = Path(__file__).parent.parent / ".gemini_usage.sqlite3"
+LEGACY_USAGE_FILE = Path(__file__).parent.parent / ".gemini_usage.json"
+USAGE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    month TEXT NOT NULL,
+    model TEXT NOT NULL,
+    tool TEXT NOT NULL,
+    cost REAL NOT NULL,
+    cached INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS monthly (
+    month TEXT NOT NULL,
+    model TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (month, model)
+);
+"""
 
-# 使用量記録ファイル
-USAGE_FILE = Path(__file__).parent.parent / ".gemini_usage.json"
+# 応答キャッシュ（同じモデル・プロンプト・生成パラメータの呼び出しを再利用）
+CACHE_FILE = Path(__file__).parent.parent / ".gemini_cache.sqlite3"
+CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_BYTES = int(os.getenv("GEMINI_CACHE_MAX_MB", "50")) * 1024 * 1024
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
 
 # kesson-space用のコンテキスト
 KESSON_CONTEXT = """
@@ -100,57 +145,239 @@ def get_model_key(model_key: str) -> str:
     return model_key if model_key in AVAILABLE_MODELS else DEFAULT_MODEL
 
 
-def load_usage() -> dict:
-    """使用量データを読み込み"""
-    if USAGE_FILE.exists():
-        try:
-            return json.loads(USAGE_FILE.read_text())
-        except:
-            pass
-    return {"calls": []}
+_client: genai.Client | None = None
+_model_semaphores: dict[str, asyncio.Semaphore] = {}
+
+
+def get_client() -> genai.Client:
+    """全ツール共通の google-genai クライアント（初回呼び出し時に作成し、以降は接続を使い回す）"""
+    global _client
+    if _client is None:
+        http_options = types.HttpOptions(
+            timeout=REQUEST_TIMEOUT_SECONDS * 1000,  # ミリ秒指定
+            base_url=GEMINI_BASE_URL,
+        )
+        _client = genai.Client(api_key=GENAI_API_KEY, http_options=http_options)
+    return _client
+
+
+def model_semaphore(model_name: str) -> asyncio.Semaphore:
+    """モデルごとの同時実行数を制限するセマフォを取得"""
+    if model_name not in _model_semaphores:
+        _model_semaphores[model_name] = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    return _model_semaphores[model_name]
+
+
+async def call_gemini(model_name: str, contents, config: types.GenerateContentConfig | None = None):
+    """非同期クライアントでGeminiを呼び出す（待機中も他のツール呼び出しは進む）"""
+    async with model_semaphore(model_name):
+        return await get_client().aio.models.generate_content(
+            model=model_name,
+            contents=contents,
+            config=config,
+        )
+
+
+_cache_db: sqlite3.Connection | None = None
+_usage_db: sqlite3.Connection | None = None
+# DBアクセスは asyncio.to_thread でイベントループの外で行う（ロック待ちで他のツールを止めないため）。
+# 接続はスレッド間で共有し、DBごとのロックで1つずつ実行する
+_cache_lock = threading.Lock()
+_usage_lock = threading.Lock()
+
+
+def open_cache() -> sqlite3.Connection:
+    """応答キャッシュのDBを開く（初回のみ）。_cache_lock を持って呼ぶ"""
+    global _cache_db
+    if _cache_db is None:
+        _cache_db = sqlite3.connect(str(CACHE_FILE), timeout=60, isolation_level=None, check_same_thread=False)
+        _cache_db.execute("PRAGMA journal_mode=WAL")
+        _cache_db.executescript(CACHE_SCHEMA)
+    return _cache_db
+
+
+def cache_key(model_name: str, prompt: str) -> str:
+    """モデル名とプロンプト全文から決まるキャッシュキー（テキスト生成は生成パラメータを指定しない）"""
+    payload = json.dumps({"model": model_name, "prompt": prompt}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_lookup(key: str) -> str | None:
+    """キャッシュから応答を取得（期限切れは削除して None）"""
+    with _cache_lock:
+        db = open_cache()
+        row = db.execute("SELECT text, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > CACHE_TTL_SECONDS:
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return None
+        db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+
+def cache_store(key: str, model_name: str, text: str):
+    """応答をキャッシュに保存し、期限切れと容量超過分（最終アクセスが古い順）を削除"""
+    with _cache_lock:
+        db = open_cache()
+        now = time.time()
+        with db:
+            db.execute("BEGIN")
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, text, len(text.encode("utf-8")), now, now),
+            )
+            db.execute("DELETE FROM responses WHERE created < ?", (now - CACHE_TTL_SECONDS,))
+            db.execute(
+                """DELETE FROM responses WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY accessed DESC, key) AS total FROM responses
+                    ) WHERE total > ?
+                )""",
+                (CACHE_MAX_BYTES,),
+            )
+
+
+async def stream_gemini(model_name: str, contents, ctx: Context) -> str | None:
+    """ストリーミングでGeminiを呼び出し、チャンクが届くたびに進捗通知で途中経過を送る"""
+    parts = []
+    received = 0
+    started = time.perf_counter()
+    async with model_semaphore(model_name):
+        stream = await get_client().aio.models.generate_content_stream(
+            model=model_name,
+            contents=contents,
+        )
+        async for chunk in stream:
+            if not chunk.text:
+                continue
+            if not parts:
+                await ctx.info(f"{model_name}: 最初の応答まで {time.perf_counter() - started:.1f}s")
+            parts.append(chunk.text)
+            received += len(chunk.text)
+            await ctx.report_progress(received, message=chunk.text)
+    return "".join(parts) or None
+
+
+async def generate_text(
+    model_name: str,
+    prompt: str,
+    use_cache: bool = True,
+    ctx: Context | None = None,
+) -> tuple[str | None, bool]:
+    """テキスト生成（キャッシュ優先。ctx があればストリーミング）。戻り値は (応答テキスト, キャッシュヒットか)"""
+    key = cache_key(model_name, prompt)
+    if use_cache:
+        text = await asyncio.to_thread(cache_lookup, key)
+        if text is not None:
+            return text, True
+    if ctx is not None:
+        text = await stream_gemini(model_name, prompt, ctx)
+    else:
+        text = (await call_gemini(model_name, prompt)).text
+    if text:
+        await asyncio.to_thread(cache_store, key, model_name, text)
+    return text, False
+
+
+def model_header(model_name: str, cached: bool = False) -> str:
+    """ツール出力の先頭に付けるモデル表示"""
+    return f"[Model: {model_name} (cached)]" if cached else f"[Model: {model_name}]"
+
+
+def open_usage() -> sqlite3.Connection:
+    """使用量台帳のDBを開く（初回のみ。旧形式の .gemini_usage.json があれば取り込む）。_usage_lock を持って呼ぶ"""
+    global _usage_db
+    if _usage_db is None:
+        _usage_db = sqlite3.connect(str(USAGE_FILE), timeout=60, isolation_level=None, check_same_thread=False)
+        _usage_db.execute("PRAGMA journal_mode=WAL")
+        _usage_db.executescript(USAGE_SCHEMA)
+        import_legacy_usage(_usage_db)
+    return _usage_db
+
+
+def append_calls(db: sqlite3.Connection, calls: list[dict]):
+    """呼び出しを台帳に追記し、同じトランザクションで月次集計を更新"""
+    with db:
+        db.execute("BEGIN IMMEDIATE")
+        for call in calls:
+            month = call["timestamp"][:7]
+            model = call.get("model", "unknown")
+            cost = call.get("cost", 0.07)
+            hit = 1 if call.get("cached") else 0
+            db.execute(
+                "INSERT INTO calls (timestamp, month, model, tool, cost, cached) VALUES (?, ?, ?, ?, ?, ?)",
+                (call["timestamp"], month, model, call.get("tool", ""), cost, hit),
+            )
+            db.execute(
+                """INSERT INTO monthly (month, model, count, cost, hits) VALUES (?, ?, 1, ?, ?)
+                   ON CONFLICT (month, model) DO UPDATE SET
+                       count = count + 1, cost = cost + excluded.cost, hits = hits + excluded.hits""",
+                (month, model, cost, hit),
+            )
+
+
+def import_legacy_usage(db: sqlite3.Connection):
+    """旧形式（全件を書き直すJSON）の使用量を台帳へ移し、元ファイルは .bak にする"""
+    if not LEGACY_USAGE_FILE.exists():
+        return
+    try:
+        calls = json.loads(LEGACY_USAGE_FILE.read_text()).get("calls", [])
+    except (ValueError, AttributeError):
+        calls = []
+    append_calls(db, [c for c in calls if "timestamp" in c])
+    LEGACY_USAGE_FILE.rename(LEGACY_USAGE_FILE.with_name(LEGACY_USAGE_FILE.name + ".bak"))
+
+
+def append_usage(call: dict):
+    with _usage_lock:
+        append_calls(open_usage(), [call])
 
 
-def save_usage(data: dict):
-    """使用量データを保存"""
-    USAGE_FILE.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+def read_monthly_usage(month: str) -> list[tuple]:
+    """月次集計の (model, count, cost, hits) 行"""
+    with _usage_lock:
+        return open_usage().execute(
+            "SELECT model, count, cost, hits FROM monthly WHERE month = ?", (month,)
+        ).fetchall()
 
 
-def record_usage(model_key: str, tool_name: str):
-    """API呼び出しを記録"""
-    data = load_usage()
-    data["calls"].append({
+def clear_usage():
+    with _usage_lock:
+        db = open_usage()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM calls")
+            db.execute("DELETE FROM monthly")
+
+
+async def record_usage(model_key: str, tool_name: str, cached: bool = False):
+    """API呼び出しを記録（キャッシュヒットはコスト0）"""
+    call = {
         "timestamp": datetime.now().isoformat(),
         "model": model_key,
         "tool": tool_name,
-        "cost": MODEL_COSTS.get(model_key, 0.07)
-    })
-    save_usage(data)
+        "cost": 0 if cached else MODEL_COSTS.get(model_key, 0.07)
+    }
+    if cached:
+        call["cached"] = True
+    await asyncio.to_thread(append_usage, call)
 
 
 @mcp.tool()
-def get_usage() -> str:
+async def get_usage() -> str:
     """
     Gemini API使用量を表示（今月の使用回数・推定コスト）
     """
-    data = load_usage()
-    calls = data.get("calls", [])
-    
-    # 今月のデータをフィルタ
+    # 今月のモデル別集計（月次ロールアップから読む）
     now = datetime.now()
     current_month = now.strftime("%Y-%m")
-    monthly_calls = [c for c in calls if c["timestamp"].startswith(current_month)]
-    
-    # モデル別集計
-    model_stats = {}
-    total_cost = 0
-    for call in monthly_calls:
-        model = call.get("model", "unknown")
-        cost = call.get("cost", 0.07)
-        if model not in model_stats:
-            model_stats[model] = {"count": 0, "cost": 0}
-        model_stats[model]["count"] += 1
-        model_stats[model]["cost"] += cost
-        total_cost += cost
+    rows = await asyncio.to_thread(read_monthly_usage, current_month)
+    model_stats = {model: {"count": count, "cost": cost} for model, count, cost, _ in rows}
+    total_calls = sum(row[1] for row in rows)
+    total_cost = sum(row[2] for row in rows)
+    cache_hits = sum(row[3] for row in rows)
     
     # 出力生成
     lines = [
@@ -161,7 +388,8 @@ def get_usage() -> str:
         f"💸 使用済み: ¥{total_cost:,.1f} ({total_cost/MONTHLY_BUDGET*100:.1f}%)",
         f"📈 残り: ¥{MONTHLY_BUDGET - total_cost:,.1f}",
         "",
-        f"📞 総呼び出し回数: {len(monthly_calls)}回",
+        f"📞 総呼び出し回数: {total_calls}回",
+        f"⚡ キャッシュヒット: {cache_hits}回（¥0）",
         "",
         "モデル別:",
     ]
@@ -185,29 +413,32 @@ def get_usage() -> str:
 
 
 @mcp.tool()
-def reset_usage() -> str:
+async def reset_usage() -> str:
     """
     使用量データをリセット（新しい月の開始時など）
     """
-    save_usage({"calls": []})
+    await asyncio.to_thread(clear_usage)
     return "✅ 使用量データをリセットしました"
 
 
 @mcp.tool()
-def generate_threejs_code(
+async def generate_threejs_code(
     task_description: str,
     model: str = "flash",
     optimization_level: str = "standard",
-    include_kesson_context: bool = True
+    include_kesson_context: bool = True,
+    use_cache: bool = False,
+    ctx: Context | None = None
 ) -> str:
     """
-    GeminiでThree.jsコードを生成
+    GeminiでThree.jsコードを生成（生成中のコードは進捗通知で逐次送られる）
     
     Args:
         task_description: 実装したいThree.jsの機能説明
         model: 使用モデル ("flash", "flash-lite", "pro", "3-flash")
         optimization_level: "standard" or "advanced"
         include_kesson_context: kesson-spaceのコンテキストを含めるか
+        use_cache: 同じ呼び出しの前回の応答を返すか（既定 False。生成は毎回違う案が返るのでAPIを呼ぶ）
     """
     context = KESSON_CONTEXT if include_kesson_context else ""
     model_key = get_model_key(model)
@@ -229,29 +460,26 @@ def generate_threejs_code(
 """
     
     try:
-        gemini = genai.GenerativeModel(model_name)
-        response = gemini.generate_content(
-            prompt,
-            request_options={"timeout": REQUEST_TIMEOUT_SECONDS},
-        )
+        text, cached = await generate_text(model_name, prompt, use_cache, ctx)
         
         # 使用量を記録
-        record_usage(model_key, "generate_threejs_code")
+        await record_usage(model_key, "generate_threejs_code", cached=cached)
         
-        if not response.text:
+        if not text:
             return "Geminiから有効な回答が得られませんでした。"
         
-        return f"[Model: {model_name}]\n\n{response.text}"
+        return f"{model_header(model_name, cached)}\n\n{text}"
         
     except Exception as e:
         return f"Gemini APIエラー: {type(e).__name__}: {str(e)}"
 
 
 @mcp.tool()
-def generate_shader(
+async def generate_shader(
     shader_description: str,
     model: str = "flash",
-    shader_type: str = "fragment"
+    shader_type: str = "fragment",
+    use_cache: bool = True
 ) -> str:
     """
     GLSLシェーダーコードを生成
@@ -260,6 +488,7 @@ def generate_shader(
         shader_description: シェーダーで実現したい視覚効果
         model: 使用モデル ("flash", "flash-lite", "pro", "3-flash")
         shader_type: "vertex", "fragment", or "both"
+        use_cache: 同じ呼び出しのキャッシュ済み応答を使うか（False で必ずAPIを呼ぶ）
     """
     model_key = get_model_key(model)
     model_name = get_model(model)
@@ -280,25 +509,22 @@ def generate_shader(
 """
     
     try:
-        gemini = genai.GenerativeModel(model_name)
-        response = gemini.generate_content(
-            prompt,
-            request_options={"timeout": REQUEST_TIMEOUT_SECONDS},
-        )
+        text, cached = await generate_text(model_name, prompt, use_cache)
         
         # 使用量を記録
-        record_usage(model_key, "generate_shader")
+        await record_usage(model_key, "generate_shader", cached=cached)
         
-        return f"[Model: {model_name}]\n\n{response.text}" if response.text else "シェーダー生成に失敗しました。"
+        return f"{model_header(model_name, cached)}\n\n{text}" if text else "シェーダー生成に失敗しました。"
     except Exception as e:
         return f"エラー: {str(e)}"
 
 
 @mcp.tool()
-def review_threejs_code(
+async def review_threejs_code(
     code: str,
     model: str = "flash",
-    focus_areas: str = "visual quality, performance, shader optimization"
+    focus_areas: str = "visual quality, performance, shader optimization",
+    use_cache: bool = True
 ) -> str:
     """
     Three.jsコードをGeminiでレビュー
@@ -307,6 +533,7 @@ def review_threejs_code(
         code: レビューするコード
         model: 使用モデル ("flash", "flash-lite", "pro", "3-flash")
         focus_areas: レビューの焦点
+        use_cache: 同じ呼び出しのキャッシュ済み応答を使うか（False で必ずAPIを呼ぶ）
     """
     model_key = get_model_key(model)
     model_name = get_model(model)
@@ -331,33 +558,32 @@ def review_threejs_code(
 """
     
     try:
-        gemini = genai.GenerativeModel(model_name)
-        response = gemini.generate_content(
-            prompt,
-            request_options={"timeout": REQUEST_TIMEOUT_SECONDS},
-        )
+        text, cached = await generate_text(model_name, prompt, use_cache)
         
         # 使用量を記録
-        record_usage(model_key, "review_threejs_code")
+        await record_usage(model_key, "review_threejs_code", cached=cached)
         
-        return f"[Model: {model_name}]\n\n{response.text}" if response.text else "レビュー結果を取得できませんでした。"
+        return f"{model_header(model_name, cached)}\n\n{text}" if text else "レビュー結果を取得できませんでした。"
     except Exception as e:
         return f"エラー: {str(e)}"
 
 
 @mcp.tool()
-def compare_implementations(
+async def compare_implementations(
     task: str,
     claude_code: str,
-    model: str = "pro"
+    model: str = "pro",
+    use_cache: bool = False,
+    ctx: Context | None = None
 ) -> str:
     """
-    Claudeのコードとの比較（デフォルトはPro）
+    Claudeのコードとの比較（デフォルトはPro。生成中の内容は進捗通知で逐次送られる）
     
     Args:
         task: 実装タスクの説明
         claude_code: Claudeが生成したコード
         model: 使用モデル ("flash", "flash-lite", "pro", "3-flash")
+        use_cache: 同じ呼び出しの前回の応答を返すか（既定 False。比較は毎回違う結果が返るのでAPIを呼ぶ）
     """
     model_key = get_model_key(model)
     model_name = get_model(model)
@@ -382,16 +608,12 @@ Claudeのコード:
 """
     
     try:
-        gemini = genai.GenerativeModel(model_name)
-        response = gemini.generate_content(
-            prompt,
-            request_options={"timeout": REQUEST_TIMEOUT_SECONDS},
-        )
+        text, cached = await generate_text(model_name, prompt, use_cache, ctx)
         
         # 使用量を記録
-        record_usage(model_key, "compare_implementations")
+        await record_usage(model_key, "compare_implementations", cached=cached)
         
-        return f"[Model: {model_name}]\n\n{response.text}" if response.text else "比較結果を取得できませんでした。"
+        return f"{model_header(model_name, cached)}\n\n{text}" if text else "比較結果を取得できませんでした。"
     except Exception as e:
         return f"エラー: {str(e)}"
 
@@ -433,7 +655,7 @@ IMAGE_COST_PER_CALL = 0.5  # 円/回（推定）
 
 
 @mcp.tool()
-def generate_image(
+async def generate_image(
     prompt: str,
     output_filename: str = "",
     style_hint: str = "",
@@ -457,13 +679,9 @@ def generate_image(
         full_prompt = f"{prompt}. Style: {style_hint}"
 
     try:
-        from google import genai as genai_new
-        from google.genai import types
-
-        client = genai_new.Client(api_key=GENAI_API_KEY)
-        response = client.models.generate_content(
-            model=IMAGE_MODEL,
-            contents=full_prompt,
+        response = await call_gemini(
+            IMAGE_MODEL,
+            full_prompt,
             config=types.GenerateContentConfig(
                 response_modalities=["IMAGE", "TEXT"],
             ),
@@ -484,7 +702,7 @@ def generate_image(
             elif part.text:
                 text_parts.append(part.text)
 
-        record_usage("image", "generate_image")
+        await record_usage("image", "generate_image")
 
         if not saved_paths:
             return f"画像生成に失敗しました。テキスト応答:\n{''.join(text_parts)}"
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""bench-sessions.py — devlog パイプライン（generate-sessions.py）のベンチマーク
+
+合成 git リポジトリを git fast-import で作り、generate-sessions.py の各段階
+（git log 取り込み → セッション分割 → カテゴリ判定 → intensity → JSON 組み立て → 書き出し）
+を計測して JSON で出力する。実リポジトリに向ける前に性能の劣化を検出するためのもの。
+
+Usage:
+    python scripts/bench-sessions.py                                # 既定: 10000 コミット
+    python scripts/bench-sessions.py --commits 1000,10000,100000    # 規模を変えて複数回
+    python scripts/bench-sessions.py --files-per-commit 8 --session-every 40
+    python scripts/bench-sessions.py --output bench.json            # 結果をファイルに保存
+    python scripts/bench-sessions.py --backend git,pygit2           # 読み出しバックエンドの比較（要 pygit2）
+    python scripts/bench-sessions.py --check-cache                  # --cache と通常経路の出力一致を確認（マージ履歴）
+"""
+
+import argparse
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+
+# 合成リポジトリのファイル配置（devlog-config.json の categories に一通り当たるように）
+FILE_TEMPLATES = [
+    "src/module-{n}.js",
+    "src/shaders/effect-{n}.glsl",
+    "docs/note-{n}.md",
+    "src/config.{n}.js",
+    "assets/image-{n}.svg",
+    "scripts/tool-{n}.py",
+    ".github/workflows/job-{n}.yml",
+    "content/page-{n}.html",
+]
+
+
+def load_generator():
+    """ハイフン入りのファイル名なので importlib で generate-sessions.py を読み込む"""
+    spec = importlib.util.spec_from_file_location("generate_sessions", SCRIPT_DIR / "generate-sessions.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def rss_kb(who=resource.RUSAGE_SELF):
+    # Linux は KB、macOS は byte 単位で返る
+    rss = resource.getrusage(who).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def make_synthetic_repo(repo_path, commits, files_per_commit, file_pool, gap_minutes, session_every,
+                        session_gap_hours, seed):
+    """git fast-import で合成履歴を一括生成する
+
+    通常は gap_minutes 前後の間隔でコミットし、session_every コミットごとに
+    session_gap_hours を超える空白を入れてセッションを区切る。
+    """
+    rng = random.Random(seed)
+    subprocess.run(["git", "init", "-q", str(repo_path)], check=True)
+    paths = [FILE_TEMPLATES[i % len(FILE_TEMPLATES)].format(n=i) for i in range(file_pool)]
+    sizes = {}
+    ts = 1_700_000_000
+
+    proc = subprocess.Popen(["git", "-C", str(repo_path), "fast-import", "--quiet"], stdin=subprocess.PIPE)
+    out = proc.stdin
+    for i in range(commits):
+        if session_every and i and i % session_every == 0:
+            ts += int(session_gap_hours * 3600) + rng.randint(60, 3600)
+        else:
+            ts += max(1, int(rng.expovariate(1 / (gap_minutes * 60))))
+        message = f"bench: commit {i}".encode()
+        out.write(b"commit refs/heads/main\n")
+        out.write(f"mark :{i + 1}\n".encode())
+        out.write(f"author Bench <bench@example.com> {ts} +0900\n".encode())
+        out.write(f"committer Bench <bench@example.com> {ts} +0900\n".encode())
+        out.write(f"data {len(message)}\n".encode() + message + b"\n")
+        if i:
+            out.write(f"from :{i}\n".encode())
+        for path in rng.sample(paths, min(files_per_commit, len(paths))):
+            sizes[path] = sizes.get(path, 0) + rng.randint(1, 5)
+            body = b"".join(b"line %d\n" % n for n in range(sizes[path]))
+            out.write(f"M 644 inline {path}\n".encode())
+            out.write(f"data {len(body)}\n".encode() + body + b"\n")
+        out.write(b"\n")
+    out.close()
+    if proc.wait() != 0:
+        raise RuntimeError("git fast-import failed")
+    subprocess.run(["git", "-C", str(repo_path), "symbolic-ref", "HEAD", "refs/heads/main"], check=True)
+    subprocess.run(["git", "-C", str(repo_path), "reset", "-q", "--hard"], check=True)
+
+
+def check_cache_equivalence(gs, workdir, gap_hours):
+    """マージを含む履歴で、--cache の読み出しが通常経路（git log）と同じセッションになるか確認する
+
+    main の M0 → M1 でキャッシュを作ってから、M1 より古い B1 と新しい B2 を持つ枝をマージする。
+    git log --reverse は M0, B1, M1, B2, Merge の順なので、差分を末尾に足すだけのキャッシュだとずれる。
+
+    Returns: 不一致の説明のリスト（空なら一致）
+    """
+    repo_path = Path(workdir) / "merge-history"
+    cache_path = Path(workdir) / "merge-history.sqlite3"
+    shutil.rmtree(repo_path, ignore_errors=True)
+    cache_path.unlink(missing_ok=True)
+    subprocess.run(["git", "init", "-q", "-b", "main", str(repo_path)], check=True)
+
+    def git(*args, at=None):
+        env = {"GIT_AUTHOR_NAME": "Bench", "GIT_AUTHOR_EMAIL": "bench@example.com",
+               "GIT_COMMITTER_NAME": "Bench", "GIT_COMMITTER_EMAIL": "bench@example.com"}
+        if at is not None:
+            env.update(GIT_AUTHOR_DATE=f"@{at} +0900", GIT_COMMITTER_DATE=f"@{at} +0900")
+        subprocess.run(["git", "-C", str(repo_path), *args], check=True, capture_output=True,
+                       env={**os.environ, **env})
+
+    def commit(name, at):
+        (repo_path / f"{name}.md").write_text(name + "\n", encoding="utf-8")
+        git("add", "-A")
+        git("commit", "-q", "-m", name, at=at)
+
+    hour = 3600
+    t0 = 1_700_000_000
+    commit("M0", t0)
+    git("checkout", "-q", "-b", "topic")
+    commit("B1", t0 + 10 * hour)
+    git("checkout", "-q", "main")
+    commit("M1", t0 + 20 * hour)
+
+    def messages(**kwargs):
+        _, sessions, _ = gs.fetch_repo_sessions(repo_path, gap_hours, **kwargs)
+        return [[c["message"] for c in session] for session in sessions]
+
+    mismatches = []
+
+    def compare(label, **kwargs):
+        plain, cached = messages(**kwargs), messages(cache_path=cache_path, **kwargs)
+        if plain != cached:
+            mismatches.append(f"{label}: git log {plain} / cache {cached}")
+
+    compare("M1")
+    cursor = subprocess.run(["git", "-C", str(repo_path), "rev-parse", "HEAD"],
+                            capture_output=True, text=True, check=True).stdout.strip()
+    git("checkout", "-q", "topic")
+    commit("B2", t0 + 30 * hour)
+    git("checkout", "-q", "main")
+    git("merge", "-q", "--no-ff", "-m", "Merge", "topic", at=t0 + 31 * hour)
+    compare("merge")
+    compare("merge --incremental", cursor=cursor)
+    compare("merge --since", since=f"@{t0 + 15 * hour}")
+    return mismatches
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, fn, items=None):
+        t0 = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - t0
+        stage = {"seconds": round(seconds, 6), "rss_kb": rss_kb()}
+        if items is not None:
+            stage["items"] = items(result) if callable(items) else items
+        self.stages[name] = stage
+        return result
+
+
+def bench_pipeline(gs, repo_path, repo_name, categories, gap_hours, columnar=False, backend="git"):
+    timer = StageTimer()
+    gs._CLASSIFIERS.clear()
+
+    commits = timer.run("get_git_log", lambda: list(gs.read_log(repo_path, backend=backend)), items=len)
+    n = len(commits)
+    totals = None
+    if columnar:
+        sessions, totals = timer.run("split_sessions_columnar",
+                                     lambda: gs.split_sessions_columnar(commits, gap_hours),
+                                     items=lambda r: len(r[0]))
+    else:
+        sessions = timer.run("split_sessions", lambda: gs.split_sessions(commits, gap_hours), items=len)
+
+    unique_files = [sorted({f for c in s for f in c.get("files", [])}) for s in sessions]
+    timer.run("dominant_category", lambda: [gs.dominant_category(f, categories) for f in unique_files],
+              items=len(sessions))
+    timer.run("dominant_category_warm", lambda: [gs.dominant_category(f, categories) for f in unique_files],
+              items=len(sessions))
+    timer.run("calc_intensity", lambda: [
+        gs.calc_intensity(len(s), sum(c["insertions"] for c in s), sum(c["deletions"] for c in s), len(f))
+        for s, f in zip(sessions, unique_files)
+    ], items=len(sessions))
+
+    gs._CLASSIFIERS.clear()
+    session_jsons = timer.run("build_session_json",
+                              lambda: gs.build_session_json(sessions, repo_name, categories, totals=totals),
+                              items=len)
+    buf = io.StringIO()
+    timer.run("write_json", lambda: gs.write_json_array(buf, session_jsons), items=len(session_jsons))
+    timer.stages["write_json"]["bytes"] = len(buf.getvalue().encode("utf-8"))
+
+    pipeline = ["get_git_log", "split_sessions_columnar" if columnar else "split_sessions",
+                "build_session_json", "write_json"]
+    total = sum(timer.stages[name]["seconds"] for name in pipeline)
+    for stage in timer.stages.values():
+        stage["commits_per_sec"] = round(n / stage["seconds"], 1) if stage["seconds"] else None
+    return {
+        "backend": backend,
+        "commits": n,
+        "sessions": len(sessions),
+        "total_seconds": round(total, 6),
+        "commits_per_sec": round(n / total, 1) if total else None,
+        "peak_rss_kb": rss_kb(),
+        "peak_rss_children_kb": rss_kb(resource.RUSAGE_CHILDREN),
+        "stages": timer.stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate-sessions.py benchmark on synthetic git history")
+    parser.add_argument("--commits", default="10000", help="コミット数（カンマ区切りで複数規模）")
+    parser.add_argument("--files-per-commit", type=int, default=4, help="1コミットで変更するファイル数")
+    parser.add_argument("--file-pool", type=int, default=400, help="履歴全体で使うファイルの種類数")
+    parser.add_argument("--gap-minutes", type=float, default=12, help="セッション内のコミット間隔の平均（分）")
+    parser.add_argument("--session-every", type=int, default=25, help="何コミットごとにセッションを区切るか（0 = 区切らない）")
+    parser.add_argument("--seed", type=int, default=1, help="乱数シード")
+    parser.add_argument("--columnar", action="store_true", help="split_sessions_columnar を計測（要 numpy）")
+    parser.add_argument("--backend", default="git", help="コミット読み出しバックエンド（カンマ区切りで比較: git,pygit2）")
+    parser.add_argument("--workdir", help="合成リポジトリの作成先（省略時は一時ディレクトリを使い捨て）")
+    parser.add_argument("--output", help="結果 JSON の出力先（省略時は標準出力）")
+    parser.add_argument("--check-cache", action="store_true", help="計測せず、マージ履歴で --cache と通常経路の出力一致だけを確認")
+    args = parser.parse_args()
+
+    gs = load_generator()
+    if args.check_cache:
+        with tempfile.TemporaryDirectory(prefix="bench-sessions-") as tmp:
+            mismatches = check_cache_equivalence(gs, args.workdir or tmp, gs.load_config().get("session_gap_hours", 3))
+        for mismatch in mismatches:
+            print(f"  ✗ {mismatch}", file=sys.stderr)
+        if mismatches:
+            sys.exit(1)
+        print("✓ --cache の出力は git log と一致", file=sys.stderr)
+        return
+    if args.columnar and gs.np is None:
+        parser.error("--columnar には numpy が必要です")
+    backends = args.backend.split(",")
+    for backend in backends:
+        if backend not in gs.LOG_BACKENDS:
+            parser.error(f"未知のバックエンド: {backend}")
+        if backend == "pygit2" and gs.pygit2 is None:
+            parser.error("--backend pygit2 には pygit2 が必要です")
+    config = gs.load_config()
+    categories = config.get("categories", gs.DEFAULT_CATEGORIES) or gs.DEFAULT_CATEGORIES
+    gap_hours = config.get("session_gap_hours", 3)
+
+    git_version = subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip()
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "git": git_version,
+        "params": {
+            "files_per_commit": args.files_per_commit, "file_pool": args.file_pool,
+            "gap_minutes": args.gap_minutes, "session_every": args.session_every,
+            "session_gap_hours": gap_hours, "seed": args.seed, "columnar": args.columnar,
+        },
+        "runs": [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix="bench-sessions-") as tmp:
+        workdir = Path(args.workdir or tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        for commits in (int(c) for c in args.commits.split(",")):
+            repo_path = workdir / f"synthetic-{commits}"
+            if not (repo_path / ".git").exists():
+                print(f"  合成リポジトリ生成: {commits} commits → {repo_path}", file=sys.stderr)
+                t0 = time.perf_counter()
+                make_synthetic_repo(repo_path, commits, args.files_per_commit, args.file_pool,
+                                    args.gap_minutes, args.session_every, gap_hours, args.seed)
+                print(f"  生成時間: {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+            for backend in backends:
+                result = bench_pipeline(gs, repo_path, "bench", categories, gap_hours,
+                                        columnar=args.columnar, backend=backend)
+                print(f"  {commits} commits [{backend}]: {result['total_seconds']:.3f}s "
+                      f"({result['commits_per_sec']} commits/s)", file=sys.stderr)
+                report["runs"].append(result)
+
+    output_json = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output_json + "\n", encoding="utf-8")
+        print(f"✓ → {args.output}", file=sys.stderr)
+    else:
+        print(output_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+bench-slides.py — Throughput benchmark for generate-rich-slides.py.
+
+Generates a corpus of Markdown decks of increasing size with a mix of
+headings, lists, tables, code blocks, quotes and images, then times
+parse_frontmatter, md_to_html, classify_slide, build_slides_html (cold and
+warm slide cache) and the end-to-end CLI. Reports slides per second and peak
+memory, and exits non-zero when throughput drops more than --threshold below
+a stored baseline.
+
+Every timed run of a stage is paired with a run of a fixed calibration workload
+(pure Python, independent of the generator) right before it. The gate compares
+the median of those stage/calibration ratios against the baseline, so a slower
+or busier machine than the one that recorded the baseline does not read as a
+regression.
+
+Usage:
+    python scripts/bench-slides.py                          # default sizes, compare to the stored baseline
+    python scripts/bench-slides.py --slides 100,1000,10000 --table-rows 500 --code-lines 200
+    python scripts/bench-slides.py --save-baseline          # record this machine's numbers as the baseline
+    python scripts/bench-slides.py --output bench.json      # write the report to a file
+"""
+
+import argparse
+import gc
+import importlib.util
+import json
+import platform
+import random
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+DEFAULT_BASELINE = SCRIPT_DIR / 'bench-slides-baseline.json'
+MIN_COMPARE_SECONDS = 0.005  # stages faster than this in the baseline are too noisy to gate on
+
+WORDS = ('欠損', 'kesson', 'shader', 'session', '構造', 'pattern', 'devlog', '余白', 'signal', 'layer',
+         'noise', '問い', 'render', 'field', 'latency', '境界')
+
+
+def load_generator():
+    """Load generate-rich-slides.py (the hyphenated name needs importlib)."""
+    spec = importlib.util.spec_from_file_location('generate_rich_slides', SCRIPT_DIR / 'generate-rich-slides.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def rss_kb(who=resource.RUSAGE_SELF):
+    # KB on Linux, bytes on macOS
+    rss = resource.getrusage(who).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+# ---------------------------------------------------------------------------
+# Corpus
+# ---------------------------------------------------------------------------
+
+def sentence(rng: random.Random, n: int = 12) -> str:
+    words = [rng.choice(WORDS) for _ in range(n)]
+    i = rng.randrange(n)
+    words[i] = rng.choice((f'**{words[i]}**', f'*{words[i]}*', f'`{words[i]}`', f'[{words[i]}](#{i})'))
+    return ' '.join(words)
+
+
+def make_slide(rng: random.Random, index: int, table_rows: int, code_lines: int) -> str:
+    """One slide; the feature mix cycles so every deck size exercises every block type."""
+    kind = index % 6
+    lines = [f'## Slide {index} — {sentence(rng, 4)}', '']
+    if kind == 0:
+        lines += [sentence(rng), '', sentence(rng)]
+    elif kind == 1:
+        lines += [f'- {sentence(rng, 8)}' for _ in range(5)]
+        lines += [''] + [f'{n}. {sentence(rng, 6)}' for n in range(1, 4)]
+    elif kind == 2:
+        lines += ['| metric | value | note |', '|---|---:|:---|']
+        lines += [f'| {rng.choice(WORDS)} | {rng.randint(0, 10_000)} | {sentence(rng, 3)} |'
+                  for _ in range(table_rows)]
+    elif kind == 3:
+        lines += ['```js'] + [f'const v{n} = uniforms.{rng.choice(WORDS)} * {n}; // <{n}>'
+                              for n in range(code_lines)] + ['```']
+    elif kind == 4:
+        lines = ['<!-- layout: quote -->'] + lines + [f'> {sentence(rng)}']
+    else:
+        lines += [f'![{rng.choice(WORDS)}](images/figure-{index}.png)', '', sentence(rng, 6)]
+    return '\n'.join(lines)
+
+
+def make_deck(slides: int, table_rows: int, code_lines: int, seed: int) -> str:
+    rng = random.Random(seed)
+    body = '\n\n---\n\n'.join(make_slide(rng, i, table_rows, code_lines) for i in range(slides))
+    return f'---\ntitle: Bench {slides}\nlang: ja\n---\n\n{body}\n'
+
+
+# ---------------------------------------------------------------------------
+# Timing
+# ---------------------------------------------------------------------------
+
+def timed(repeat: int, fn):
+    """Run fn repeat times, each right after a calibration run.
+
+    Returns (median seconds, best seconds, median seconds / calibration seconds, last result).
+    """
+    times = []
+    ratios = []
+    result = None
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        calibration_workload()
+        t1 = time.perf_counter()
+        result = fn()
+        t2 = time.perf_counter()
+        times.append(t2 - t1)
+        ratios.append((t2 - t1) / (t1 - t0))
+    return statistics.median(times), min(times), statistics.median(ratios), result
+
+
+def calibration_workload():
+    """Fixed pure-Python work (regex, string and dict operations) used as the timing reference."""
+    text = ' '.join(WORDS) * 40
+    counts = {}
+    for i in range(100):
+        for word in re.findall(r'\w+', text.replace('a', str(i % 10))):
+            counts[word] = counts.get(word, 0) + 1
+    return len(counts)
+
+
+def stage(timing: tuple, slides: int) -> dict:
+    seconds, best, relative = timing[:3]
+    return {'seconds': round(seconds, 6), 'best_seconds': round(best, 6), 'relative': round(relative, 4),
+            'slides_per_sec': round(slides / seconds, 1) if seconds else None}
+
+
+def bench_deck(gen, md_text: str, deck_path: Path, workdir: Path, repeat: int) -> dict:
+    timing = timed(repeat, lambda: gen.parse_frontmatter(md_text))
+    meta, slides = gen.parse_deck(md_text)
+    n = len(slides)
+    stages = {'parse_frontmatter': stage(timing, n)}
+
+    timing = timed(repeat, lambda: [gen.md_to_html(slide.markdown) for slide in slides])
+    stages['md_to_html'] = stage(timing, n)
+    inner = timing[3]
+    timing = timed(repeat, lambda: [gen.classify_slide(html, slide.index, n, slide.hint)
+                                    for html, slide in zip(inner, slides)])
+    stages['classify_slide'] = stage(timing, n)
+
+    timing = timed(repeat, lambda: gen.build_slides_html(md_text, cache_dir=None))
+    stages['build_slides_html'] = stage(timing, n)
+    stages['build_slides_html']['bytes'] = len(timing[3].encode('utf-8'))
+
+    cache_dir = workdir / f'cache-{n}'
+    gen.build_slides_html(md_text, cache_dir=cache_dir)
+    timing = timed(repeat, lambda: gen.build_slides_html(md_text, cache_dir=cache_dir))
+    stages['build_slides_html_cached'] = stage(timing, n)
+
+    tracemalloc.start()
+    gen.build_slides_html(md_text, cache_dir=None)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    cmd = [sys.executable, str(SCRIPT_DIR / 'generate-rich-slides.py'), str(deck_path),
+           '-o', str(workdir / f'deck-{n}.html'), '--no-cache', '-j', '1']
+    timing = timed(repeat, lambda: subprocess.run(cmd, check=True, capture_output=True))
+    stages['cli'] = stage(timing, n)
+
+    return {
+        'slides': n,
+        'markdown_bytes': len(md_text.encode('utf-8')),
+        'peak_traced_kb': peak // 1024,
+        'peak_rss_kb': rss_kb(),
+        'peak_rss_children_kb': rss_kb(resource.RUSAGE_CHILDREN),
+        'stages': stages,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Baseline comparison
+# ---------------------------------------------------------------------------
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Return a message for every (deck size, stage) whose throughput fell below baseline * (1 - threshold).
+
+    Throughput is compared relative to the calibration workload, so the ratio
+    is baseline relative time / current relative time.
+    """
+    base_runs = {run['slides']: run for run in baseline.get('runs', [])}
+    regressions = []
+    for run in report['runs']:
+        base = base_runs.get(run['slides'])
+        if not base:
+            continue
+        for name, current in run['stages'].items():
+            base_stage = base['stages'].get(name, {})
+            if not base_stage.get('relative') or base_stage['seconds'] < MIN_COMPARE_SECONDS:
+                continue
+            ratio = base_stage['relative'] / current['relative']
+            current['baseline_ratio'] = round(ratio, 3)
+            if ratio < 1 - threshold:
+                regressions.append(f'{run["slides"]} slides / {name}: {current["relative"]:.2f}x calibration '
+                                   f'vs baseline {base_stage["relative"]:.2f}x ({ratio:.0%} of baseline throughput)')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='generate-rich-slides.py throughput benchmark')
+    parser.add_argument('--slides', default='50,500,2000', help='Deck sizes in slides (comma-separated)')
+    parser.add_argument('--table-rows', type=int, default=40, help='Rows per table slide')
+    parser.add_argument('--code-lines', type=int, default=60, help='Lines per code-block slide')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement; the median is kept')
+    parser.add_argument('--seed', type=int, default=1, help='Corpus random seed')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='Baseline report to compare against')
+    parser.add_argument('--threshold', type=float, default=0.3,
+                        help='Allowed throughput drop versus the baseline (0.3 = 30%%)')
+    parser.add_argument('--save-baseline', action='store_true', help='Write this run to --baseline instead of comparing')
+    parser.add_argument('--workdir', help='Where to write the corpus (default: a throwaway temp dir)')
+    parser.add_argument('--output', help='Report JSON path (default: stdout)')
+    args = parser.parse_args()
+
+    gen = load_generator()
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {'table_rows': args.table_rows, 'code_lines': args.code_lines, 'seed': args.seed},
+        'runs': [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix='bench-slides-') as tmp:
+        workdir = Path(args.workdir or tmp)
+        workdir.mkdir(parents=True, exist_ok=True)
+        for size in (int(s) for s in args.slides.split(',')):
+            md_text = make_deck(size, args.table_rows, args.code_lines, args.seed)
+            deck_path = workdir / f'deck-{size}.md'
+            deck_path.write_text(md_text, encoding='utf-8')
+            result = bench_deck(gen, md_text, deck_path, workdir, args.repeat)
+            build = result['stages']['build_slides_html']
+            print(f'  {size} slides: build {build["seconds"]:.3f}s ({build["slides_per_sec"]:,} slides/s), '
+                  f'peak {result["peak_traced_kb"]:,} KB', file=sys.stderr)
+            report['runs'].append(result)
+
+    baseline_path = Path(args.baseline)
+    regressions = []
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+        print(f'Baseline saved: {baseline_path}', file=sys.stderr)
+    elif baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+        if baseline.get('params') != report['params']:
+            print(f'Warning: baseline {baseline_path} was recorded with different corpus params', file=sys.stderr)
+        regressions = compare(report, baseline, args.threshold)
+        report['regressions'] = regressions
+
+    output_json = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output_json + '\n', encoding='utf-8')
+        print(f'Report: {args.output}', file=sys.stderr)
+    else:
+        print(output_json)
+
+    if regressions:
+        print('Throughput regressions:', file=sys.stderr)
+        for message in regressions:
+            print(f'  {message}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
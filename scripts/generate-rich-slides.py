@@ -5,6 +5,12 @@ generate_slides.py — Convert Markdown to rich 16:9 HTML slide deck.
 Usage:
     python generate_slides.py --input slides.md --output slides.html [--title "Title"] [--lang ja]
     python generate_slides.py slides.md  # output defaults to same name with .html
+    python generate_slides.py slides.md -o - > slides.html  # stream to stdout
+    python generate_slides.py slides.md --lazy 3  # first 3 slides inline, the rest in slides.slides/
+    python generate_slides.py slides.md --optimize-images avif  # resized, fingerprinted images (needs Pillow)
+    python generate_slides.py slides.md --formats html,outline,search  # + slides.outline.json, slides.search.json
+    python generate_slides.py content/guides 'decks/**/*.md' -j 4  # batch: one process, worker pool
+    python generate_slides.py content/guides --watch  # rebuild decks as their source changes
 
 Input format:
     - Slides separated by `---` on its own line
@@ -18,19 +24,35 @@ Adapted for: kesson-space
 # CHANGED(2026-03-24) — ported from creation-space, paths adapted for kesson-space
 
 import argparse
+import glob
+import hashlib
+import io
+import os
 import re
+import sqlite3
 import sys
 import json
+import time
+from functools import partial
 from pathlib import Path
 from html import escape
+from urllib.parse import quote, unquote
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
 
 
 # ---------------------------------------------------------------------------
 # Frontmatter
 # ---------------------------------------------------------------------------
 
+FRONTMATTER_RE = re.compile(r'^---\n(.*?)\n---\n(.*)$', re.DOTALL)
+
+
 def parse_frontmatter(text: str) -> tuple[dict, str]:
-    m = re.match(r'^---\n(.*?)\n---\n(.*)$', text, re.DOTALL)
+    m = FRONTMATTER_RE.match(text)
     if not m:
         return {}, text.strip()
     meta = {}
@@ -47,15 +69,164 @@ def parse_frontmatter(text: str) -> tuple[dict, str]:
 # Markdown → HTML (lightweight, no external deps)
 # ---------------------------------------------------------------------------
 
-def md_to_html(md: str) -> str:
-    """Convert a single slide's markdown to HTML. Minimal but sufficient."""
+# Block-level line classifier, applied once to each stripped line. The
+# alternatives are mutually exclusive on their first character, so a single
+# match decides the block kind.
+BLOCK_RE = re.compile(
+    r'(?P<fence>```)'
+    r'|(?P<table>\|)'
+    r'|(?P<hashes>#{1,3})\s+(?P<heading>.+)'
+    r'|(?P<quote>>)'
+    r'|[-*]\s+(?P<ul>.+)'
+    r'|\d+\.\s+(?P<ol>.+)'
+)
+
+# Inline lexer: one left-to-right scan. Link text may wrap an image, and
+# italic text may wrap complete bold runs, so nesting matches the old
+# images → links → bold → italic → code pass order on ordinary input.
+# A *** that opens or closes both runs at once (***a** b*, ***a* b**,
+# **a *b***) is split into properly nested tags.
+# Code spans, image alt/src and link hrefs are emitted verbatim.
+INLINE_RE = re.compile(
+    r'!\[(?P<alt>[^\]]*)\]\((?P<src>[^)]+)\)'
+    r'|\[(?P<text>(?:!\[[^\]]*\]\([^)]+\)|[^\]])+)\]\((?P<href>[^)]+)\)'
+    r'|\*\*\*(?P<strong_em>.+?)\*\*\*'
+    r'|\*\*\*(?P<em_strong>[^*]+?)\*\*(?P<em_after>[^*]*?)\*(?!\*)'
+    r'|\*\*\*(?P<strong_em_lead>[^*]+?)\*(?P<strong_after>[^*]*?)\*\*(?!\*)'
+    r'|\*\*(?P<strong_before>[^*]+?)\*(?P<strong_em_end>[^*]+?)\*\*\*'
+    r'|\*\*(?P<strong>.+?)\*\*'
+    r'|\*(?P<em>(?:\*\*.+?\*\*|[^*])+?)\*(?!\*)'
+    r'|`(?P<code>[^`]+)`'
+)
+# A row whose every cell is only dashes/colons (matched after stripping the outer pipes)
+TABLE_SEP_ROW_RE = re.compile(r'\s*[-:]+\s*(?:\|\s*[-:]+\s*)*')
+# Inline pager handlers, so paginated tables also work inside lazily inserted slides
+TABLE_PAGER_JS = ("const p=this.closest('.table-pager'),t=p.querySelectorAll('template'),"
+                  "i=Math.max(0,Math.min(t.length-1,+p.dataset.page+%d));p.dataset.page=i;"
+                  "p.querySelector('tbody').replaceChildren(t[i].content.cloneNode(true));"
+                  "p.querySelector('.table-pager-count').textContent=(i+1)+' / '+t.length")
+TABLE_PAGER_NAV_STYLE = 'display:flex;gap:0.75rem;align-items:center;justify-content:flex-end;margin-top:0.5rem'
+CONCLUSION_KEYWORDS = ('結論', 'まとめ', 'Conclusion', 'Takeaway')
+
+
+def _inline_token(m: re.Match) -> str:
+    kind = m.lastgroup
+    if kind == 'src':
+        return f'<img src="{m["src"]}" alt="{m["alt"]}">'
+    if kind == 'href':
+        return f'<a href="{m["href"]}" style="color:var(--accent-blue)">{inline(m["text"])}</a>'
+    if kind == 'strong_em':
+        return f'<strong><em>{inline(m["strong_em"])}</em></strong>'
+    if kind == 'em_after':
+        return f'<em><strong>{inline(m["em_strong"])}</strong>{inline(m["em_after"])}</em>'
+    if kind == 'strong_after':
+        return f'<strong><em>{inline(m["strong_em_lead"])}</em>{inline(m["strong_after"])}</strong>'
+    if kind == 'strong_em_end':
+        return f'<strong>{inline(m["strong_before"])}<em>{inline(m["strong_em_end"])}</em></strong>'
+    if kind == 'strong':
+        return f'<strong>{inline(m["strong"])}</strong>'
+    if kind == 'em':
+        return f'<em>{inline(m["em"])}</em>'
+    return f'<code>{m["code"]}</code>'
+
+
+def inline(text: str) -> str:
+    """Inline markdown: bold, italic, code, links, images."""
+    return INLINE_RE.sub(_inline_token, text)
+
+
+def tokenize_blocks(md: str):
+    """Yield (kind, value) block tokens for one slide in a single pass over its lines.
+
+    Kinds: 'code' (list of lines), 'table' (list of raw rows), 'heading'
+    ((level, text)), 'quote', 'ul', 'ol', 'para' (text) and 'blank'.
+    """
     lines = md.split('\n')
+    n = len(lines)
+    i = 0
+    while i < n:
+        stripped = lines[i].strip()
+        m = BLOCK_RE.match(stripped)
+        kind = m.lastgroup if m else None
+        if kind == 'fence':
+            start = i + 1
+            i = start
+            while i < n and not lines[i].lstrip().startswith('```'):
+                i += 1
+            # An unterminated fence swallows the rest of the slide
+            if i < n or i > start:
+                yield 'code', lines[start:i]
+            i += 1
+            continue
+        if kind == 'table':
+            start = i
+            i += 1
+            while i < n and lines[i].lstrip().startswith('|'):
+                i += 1
+            yield 'table', lines[start:i]
+            continue
+        i += 1
+        if not stripped:
+            yield 'blank', None
+        elif kind == 'heading':
+            yield 'heading', (len(m['hashes']), m['heading'])
+        elif kind == 'quote':
+            yield 'quote', stripped.lstrip('> ')
+        elif kind in ('ul', 'ol'):
+            yield kind, m[kind]
+        else:
+            yield 'para', stripped
+
+
+def _table_row(row: str, tag: str) -> str:
+    return '<tr>' + ''.join([f'<{tag}>{inline(c.strip())}</{tag}>' for c in row.split('|')]) + '</tr>'
+
+
+def _render_table(rows: list, cls: str, page_rows: int = 0) -> str:
+    """Render table rows; with page_rows > 0, bodies longer than that become a paginated block."""
+    header = ''
+    body = []
+    for i, row in enumerate(rows):
+        row = row.strip('|')
+        # Skip separator row
+        if TABLE_SEP_ROW_RE.fullmatch(row):
+            continue
+        if i == 0:
+            header = _table_row(row, 'th')
+        else:
+            body.append(_table_row(row, 'td'))
+    if not page_rows or len(body) <= page_rows:
+        return ''.join([f'<table class="{cls}">', header, *body, '</table>'])
+    return _render_table_pages(header, body, cls, page_rows)
+
+
+def _render_table_pages(header: str, body: list, cls: str, page_rows: int) -> str:
+    """Only the current page is live DOM; every page is kept in an inert <template>."""
+    pages = [''.join(body[i:i + page_rows]) for i in range(0, len(body), page_rows)]
+    out = [f'<div class="table-pager {cls}" data-page="0"><table>']
+    if header:
+        out.append(f'<thead>{header}</thead>')
+    out.append(f'<tbody>{pages[0]}</tbody></table>')
+    out.extend(f'<template>{page}</template>' for page in pages)
+    out.append(f'<div class="table-pager-nav" style="{TABLE_PAGER_NAV_STYLE}">'
+               f'<button type="button" onclick="{TABLE_PAGER_JS % -1}">&lsaquo;</button>'
+               f'<span class="table-pager-count">1 / {len(pages)}</span>'
+               f'<button type="button" onclick="{TABLE_PAGER_JS % 1}">&rsaquo;</button></div></div>')
+    return ''.join(out)
+
+
+def md_to_html(md: str, table_page_rows: int = 0) -> str:
+    """Convert a single slide's markdown to HTML. Minimal but sufficient.
+
+    Tables with more than table_page_rows body rows are paginated (0 = never).
+    """
+    return blocks_to_html(tokenize_blocks(md), table_page_rows)
+
+
+def blocks_to_html(blocks, table_page_rows: int = 0) -> str:
+    """Render block tokens from tokenize_blocks to the slide's inner HTML."""
     out = []
     in_list = None  # 'ul' or 'ol'
-    in_code = False
-    code_buf = []
-    in_table = False
-    table_buf = []
     delay = 0
 
     def next_delay():
@@ -63,124 +234,37 @@ def md_to_html(md: str) -> str:
         delay += 1
         return f'animate-in delay-{min(delay, 5)}'
 
-    def flush_list():
-        nonlocal in_list
+    for kind, value in blocks:
+        if kind == 'ul' or kind == 'ol':
+            if in_list != kind:
+                if in_list:
+                    out.append(f'</{in_list}>')
+                in_list = kind
+                out.append(f'<{kind}>')
+            out.append(f'<li class="{next_delay()}">{inline(value)}</li>')
+            continue
         if in_list:
             out.append(f'</{in_list}>')
             in_list = None
 
-    def flush_table():
-        nonlocal in_table, table_buf
-        if not in_table:
-            return
-        in_table = False
-        rows = table_buf
-        table_buf = []
-        if not rows:
-            return
-        html = f'<table class="{next_delay()}">'
-        for i, row in enumerate(rows):
-            cells = [c.strip() for c in row.strip('|').split('|')]
-            # Skip separator row
-            if all(re.match(r'^[-:]+$', c) for c in cells):
-                continue
-            tag = 'th' if i == 0 else 'td'
-            html += '<tr>' + ''.join(f'<{tag}>{inline(c)}</{tag}>' for c in cells) + '</tr>'
-        html += '</table>'
-        out.append(html)
-
-    def inline(text: str) -> str:
-        """Inline markdown: bold, italic, code, links, images."""
-        # Images
-        text = re.sub(r'!\[([^\]]*)\]\(([^)]+)\)', r'<img src="\2" alt="\1">', text)
-        # Links
-        text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2" style="color:var(--accent-blue)">\1</a>', text)
-        # Bold
-        text = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', text)
-        # Italic
-        text = re.sub(r'\*(.+?)\*', r'<em>\1</em>', text)
-        # Inline code
-        text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
-        return text
-
-    for line in lines:
-        # Code fence
-        if line.strip().startswith('```'):
-            if in_code:
-                out.append(f'<pre class="{next_delay()}"><code>' + escape('\n'.join(code_buf)) + '</code></pre>')
-                code_buf = []
-                in_code = False
-            else:
-                flush_list()
-                flush_table()
-                in_code = True
-            continue
-        if in_code:
-            code_buf.append(line)
-            continue
-
-        # Table
-        if '|' in line and line.strip().startswith('|'):
-            flush_list()
-            if not in_table:
-                in_table = True
-            table_buf.append(line)
-            continue
-        else:
-            flush_table()
-
-        stripped = line.strip()
-        if not stripped:
-            flush_list()
-            continue
-
-        # Headings
-        hm = re.match(r'^(#{1,3})\s+(.+)$', stripped)
-        if hm:
-            flush_list()
-            level = len(hm.group(1))
+        if kind == 'code':
+            out.append(f'<pre class="{next_delay()}"><code>' + escape('\n'.join(value)) + '</code></pre>')
+        elif kind == 'table':
+            out.append(_render_table(value, next_delay(), table_page_rows))
+        elif kind == 'heading':
+            level, text = value
             tag = f'h{level}'
-            out.append(f'<{tag} class="{next_delay()}">{inline(hm.group(2))}</{tag}>')
+            out.append(f'<{tag} class="{next_delay()}">{inline(text)}</{tag}>')
             if level <= 2:
-                suffix = '--green' if level == 2 and any(kw in hm.group(2) for kw in ['結論', 'まとめ', 'Conclusion', 'Takeaway']) else ''
+                suffix = '--green' if level == 2 and any(kw in text for kw in CONCLUSION_KEYWORDS) else ''
                 out.append(f'<div class="accent-line{" accent-line" + suffix if suffix else ""} {next_delay()}"></div>')
-            continue
+        elif kind == 'quote':
+            out.append(f'<blockquote class="{next_delay()}">{inline(value)}</blockquote>')
+        elif kind == 'para':
+            out.append(f'<p class="{next_delay()}">{inline(value)}</p>')
 
-        # Blockquote
-        if stripped.startswith('>'):
-            flush_list()
-            quote_text = inline(stripped.lstrip('> '))
-            out.append(f'<blockquote class="{next_delay()}">{quote_text}</blockquote>')
-            continue
-
-        # Unordered list
-        um = re.match(r'^[-*]\s+(.+)$', stripped)
-        if um:
-            if in_list != 'ul':
-                flush_list()
-                in_list = 'ul'
-                out.append('<ul>')
-            out.append(f'<li class="{next_delay()}">{inline(um.group(1))}</li>')
-            continue
-
-        # Ordered list
-        om = re.match(r'^\d+\.\s+(.+)$', stripped)
-        if om:
-            if in_list != 'ol':
-                flush_list()
-                in_list = 'ol'
-                out.append('<ol>')
-            out.append(f'<li class="{next_delay()}">{inline(om.group(1))}</li>')
-            continue
-
-        # Paragraph
-        flush_list()
-        out.append(f'<p class="{next_delay()}">{inline(stripped)}</p>')
-
-    flush_list()
-    flush_table()
-    if in_code and code_buf:
-        out.append(f'<pre class="{next_delay()}"><code>' + escape('\n'.join(code_buf)) + '</code></pre>')
+    if in_list:
+        out.append(f'</{in_list}>')
 
     return '\n'.join(out)
 
@@ -222,32 +306,485 @@ def classify_slide(html: str, index: int, total: int, hint: str = '') -> tuple[s
     return f'layout-{layout}', f'slide-bg--{bg}'
 
 
+# ---------------------------------------------------------------------------
+# Design-spec template
+# ---------------------------------------------------------------------------
+
+# CHANGED(2026-03-24) — kesson-space path: docs/rich-slides-design-spec.md
+SPEC_PATH = Path(__file__).parent.parent / 'docs' / 'rich-slides-design-spec.md'
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / '.slides-cache'
+TEMPLATE_CACHE_VERSION = 1
+
+SPEC_SHELL_RE = re.compile(r'```html\n(<!DOCTYPE html>.*?)</body>\s*</html>\s*```', re.DOTALL)
+# Placeholders in the spec shell and the slot each one becomes
+TEMPLATE_SLOTS = {
+    '  <!-- SLIDES GO HERE -->': 'slides',
+    '{{TITLE}}': 'title',
+    'lang="ja"': 'lang',
+}
+TEMPLATE_SLOT_RE = re.compile('|'.join(re.escape(p) for p in TEMPLATE_SLOTS))
+
+# spec path → (mtime_ns, size, template)
+_TEMPLATES: dict = {}
+
+
+def parse_shell_template(spec_text: str):
+    """Extract the HTML shell from the spec and split it at its placeholders.
+
+    Returns a list alternating literal text and slot names
+    (``[text, slot, text, slot, ..., text]``), or None if the spec has no shell.
+    """
+    shell_match = SPEC_SHELL_RE.search(spec_text)
+    if not shell_match:
+        return None
+    return split_shell_template(shell_match.group(1) + '</body>\n</html>')
+
+
+def split_shell_template(shell: str) -> list:
+    parts = []
+    pos = 0
+    for m in TEMPLATE_SLOT_RE.finditer(shell):
+        parts.append(shell[pos:m.start()])
+        parts.append(TEMPLATE_SLOTS[m.group(0)])
+        pos = m.end()
+    parts.append(shell[pos:])
+    return parts
+
+
+def _read_template_cache(cache_file: Path):
+    try:
+        cached = json.loads(cache_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+    if cached.get('version') != TEMPLATE_CACHE_VERSION:
+        return None
+    return cached
+
+
+def _write_template_cache(cache_file: Path, entry: dict):
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_name(f'{cache_file.name}.{os.getpid()}.tmp')
+        tmp.write_text(json.dumps(entry, ensure_ascii=False), encoding='utf-8')
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        print(f'Warning: could not write template cache {cache_file}: {e}', file=sys.stderr)
+
+
+def load_shell_template(spec_path: Path = SPEC_PATH, cache_dir: Path | None = DEFAULT_CACHE_DIR):
+    """Return the parsed spec shell (see parse_shell_template), or None.
+
+    Cached in memory per process and, unless cache_dir is None, on disk as
+    ``spec-template.json``. A cache entry is reused while the spec's mtime and
+    size are unchanged; otherwise the spec is re-read and the entry is kept
+    only if its SHA-256 still matches.
+    """
+    try:
+        st = spec_path.stat()
+    except OSError:
+        return None
+    key = str(spec_path.resolve())
+    hit = _TEMPLATES.get(key)
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+        return hit[2]
+
+    cache_file = cache_dir / 'spec-template.json' if cache_dir else None
+    cached = _read_template_cache(cache_file) if cache_file else None
+    if cached and cached.get('spec') != key:
+        cached = None
+    if cached and cached['mtime_ns'] == st.st_mtime_ns and cached['size'] == st.st_size:
+        parts = cached['parts']
+    else:
+        spec_bytes = spec_path.read_bytes()
+        digest = hashlib.sha256(spec_bytes).hexdigest()
+        if cached and cached['sha256'] == digest:
+            parts = cached['parts']
+        else:
+            parts = parse_shell_template(spec_bytes.decode('utf-8'))
+        if cache_file:
+            _write_template_cache(cache_file, {
+                'version': TEMPLATE_CACHE_VERSION, 'spec': key, 'mtime_ns': st.st_mtime_ns,
+                'size': st.st_size, 'sha256': digest, 'parts': parts,
+            })
+
+    _TEMPLATES[key] = (st.st_mtime_ns, st.st_size, parts)
+    return parts
+
+
+def iter_shell_template(parts: list, slides, title: str, lang: str, body_end: str = ''):
+    """Yield the shell with its slots filled, streaming slides from any iterable.
+
+    body_end is inserted just before the closing </body> tag.
+    """
+    for i, part in enumerate(parts):
+        if not i % 2:
+            if body_end and i == len(parts) - 1:
+                cut = part.rfind('</body>')
+                part = part[:cut] + body_end + part[cut:]
+            yield part
+        elif part == 'slides':
+            for j, slide in enumerate(slides):
+                if j:
+                    yield '\n'
+                yield slide
+        elif part == 'title':
+            yield escape(title)
+        else:
+            yield f'lang="{lang}"'
+
+
+# ---------------------------------------------------------------------------
+# Slide render cache
+# ---------------------------------------------------------------------------
+
+# Any edit to this script changes the version, so stale renders are never reused
+GENERATOR_VERSION = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()[:16]
+
+SLIDE_CACHE_VERSION = 1  # bump when the slides table changes; older tables are dropped
+SLIDE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slides (key TEXT PRIMARY KEY, html TEXT NOT NULL, version TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS slides_version ON slides (version);
+"""
+SLIDE_CACHE_BATCH = 500
+
+
+def open_slide_cache(cache_dir: Path):
+    """Open the per-slide render cache (slides.sqlite3 in cache_dir), or None if unavailable."""
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(cache_dir / 'slides.sqlite3'), timeout=60)
+        conn.execute('PRAGMA journal_mode=WAL')
+        if conn.execute('PRAGMA user_version').fetchone()[0] != SLIDE_CACHE_VERSION:
+            conn.executescript(f'DROP TABLE IF EXISTS slides; PRAGMA user_version = {SLIDE_CACHE_VERSION};')
+        conn.executescript(SLIDE_CACHE_SCHEMA)
+    except (OSError, sqlite3.Error) as e:
+        print(f'Warning: slide cache disabled ({e})', file=sys.stderr)
+        return None
+    try:
+        prune_slide_cache(conn)
+    except sqlite3.Error as e:
+        print(f'Warning: could not prune slide cache ({e})', file=sys.stderr)
+    return conn
+
+
+def prune_slide_cache(conn) -> int:
+    """Delete renders made by other versions of this script; their keys can never match again.
+
+    Returns the number of rows removed.
+    """
+    if not conn.execute('SELECT 1 FROM slides WHERE version != ? LIMIT 1', (GENERATOR_VERSION,)).fetchone():
+        return 0
+    with conn:
+        return conn.execute('DELETE FROM slides WHERE version != ?', (GENERATOR_VERSION,)).rowcount
+
+
+def slide_cache_key(chunk: str, hint: str, position: str, options: str = '') -> str:
+    h = hashlib.sha256()
+    for part in (GENERATOR_VERSION, options, position, hint, chunk):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def slide_position(index: int, total: int) -> str:
+    """Position class used by classify_slide and the active flag: first, last or middle."""
+    if index == 0:
+        return 'first'
+    return 'last' if index == total - 1 else 'middle'
+
+
+def lookup_slides(conn, keys: list) -> dict:
+    found = {}
+    unique = list(dict.fromkeys(keys))
+    for i in range(0, len(unique), SLIDE_CACHE_BATCH):
+        batch = unique[i:i + SLIDE_CACHE_BATCH]
+        rows = conn.execute(f'SELECT key, html FROM slides WHERE key IN ({",".join("?" * len(batch))})', batch)
+        found.update(rows)
+    return found
+
+
+def store_slides(conn, rendered: dict):
+    if not rendered:
+        return
+    with conn:
+        conn.executemany('INSERT OR REPLACE INTO slides (key, html, version) VALUES (?, ?, ?)',
+                         ((key, html, GENERATOR_VERSION) for key, html in rendered.items()))
+
+
+# ---------------------------------------------------------------------------
+# Lazy-loading output
+# ---------------------------------------------------------------------------
+
+LAZY_IMG_RE = re.compile(r'<img(?![^>]*\bloading=)')
+LAZY_PREFETCH = 2  # slides loaded ahead of the current one
+
+# Fills `.slide[data-lazy-slide]` placeholders when a slide (or one of the
+# LAZY_PREFETCH slides before it) becomes active. Works with any shell that
+# toggles the `active` class, so the spec and fallback navigation stay as-is.
+LAZY_LOADER_JS = '''<script>
+(function () {
+  const base = %(base)s, bundle = %(bundle)s, ahead = %(ahead)d;
+  const all = Array.from(document.querySelectorAll('.slide'));
+  let data = null;
+  function fetchSlide(i) {
+    if (!bundle) return fetch(base + '/' + i + '.html').then(r => r.text());
+    data = data || fetch(base + '.json').then(r => r.json());
+    return data.then(d => d.slides[i - d.start]);
+  }
+  function load(i) {
+    const el = all[i];
+    if (!el || el.dataset.lazySlide === undefined) return;
+    delete el.dataset.lazySlide;
+    fetchSlide(i).then(html => {
+      const t = document.createElement('template');
+      t.innerHTML = html.trim();
+      const s = t.content.firstElementChild;
+      el.className = s.className + (el.classList.contains('active') ? ' active' : '');
+      el.replaceChildren(...s.childNodes);
+    });
+  }
+  function near(el) {
+    const i = all.indexOf(el);
+    for (let k = 0; k <= ahead; k++) load(i + k);
+  }
+  new MutationObserver(records => records.forEach(r => {
+    if (r.target.classList.contains('slide') && r.target.classList.contains('active')) near(r.target);
+  })).observe(document.body, { subtree: true, attributes: true, attributeFilter: ['class'] });
+  all.forEach(el => { if (el.classList.contains('active')) near(el); });
+})();
+</script>
+'''
+
+
+def lazy_images(html: str) -> str:
+    return LAZY_IMG_RE.sub('<img loading="lazy" decoding="async"', html)
+
+
+def lazy_asset_path(output_path: Path, bundle: bool) -> Path:
+    """Where the deferred slides of output_path go: <stem>.slides/ or <stem>.slides.json."""
+    return output_path.with_name(output_path.stem + ('.slides.json' if bundle else '.slides'))
+
+
+def lazy_loader_script(output_path: Path, bundle: bool) -> str:
+    base = output_path.stem + '.slides'
+    return LAZY_LOADER_JS % {'base': json.dumps(base), 'bundle': json.dumps(bundle), 'ahead': LAZY_PREFETCH}
+
+
+def split_lazy_slides(slides, eager: int, asset_path: Path, bundle: bool):
+    """Yield the first `eager` slides inline and a placeholder for each later one.
+
+    Deferred slides are written as they stream past, either one fragment file
+    per slide under asset_path or a single JSON bundle
+    ``{"start": eager, "slides": [...]}`` at asset_path.
+    """
+    if bundle:
+        fp = open(asset_path, 'w', encoding='utf-8')
+        fp.write(f'{{"start": {eager}, "slides": [')
+    else:
+        asset_path.mkdir(parents=True, exist_ok=True)
+        for stale in asset_path.glob('*.html'):
+            stale.unlink()
+    try:
+        for i, slide in enumerate(slides):
+            slide = lazy_images(slide)
+            if i < eager:
+                yield slide
+                continue
+            if bundle:
+                fp.write((',' if i > eager else '') + json.dumps(slide, ensure_ascii=False))
+            else:
+                (asset_path / f'{i}.html').write_text(slide, encoding='utf-8')
+            yield f'<div class="slide" data-lazy-slide="{i}"></div>'
+    finally:
+        if bundle:
+            fp.write(']}')
+            fp.close()
+
+
+# ---------------------------------------------------------------------------
+# Image optimization (optional, needs Pillow)
+# ---------------------------------------------------------------------------
+
+IMAGE_ASSET_DIR = 'slide-assets'
+IMAGE_BOX = (1920, 1080)  # 16:9 slide box at 1080p
+IMAGE_QUALITY = 80
+IMAGE_FORMATS = {'webp': 'WEBP', 'avif': 'AVIF'}
+RASTER_SUFFIXES = {'.png', '.jpg', '.jpeg', '.webp', '.bmp', '.tif', '.tiff'}
+
+IMG_TAG_RE = re.compile(r'<img\b[^>]*>')
+IMG_SRC_RE = re.compile(r'\bsrc="([^"]*)"')
+
+IMAGE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    key TEXT PRIMARY KEY, file TEXT NOT NULL, width INTEGER NOT NULL, height INTEGER NOT NULL
+);
+"""
+
+
+class ImageOptimizer:
+    """Rewrites local <img> references to resized, transcoded, content-hashed copies.
+
+    Sources are resolved relative to source_dir and written to asset_dir as
+    ``<name>.<hash>.<format>``; the hash covers the source bytes and the
+    encoding settings, so unchanged images keep their URL. Results are
+    remembered in the slide cache (keyed by path, mtime and size) so a
+    rebuild does not decode anything that has not changed.
+    """
+
+    def __init__(self, source_dir: Path, output_dir: Path, asset_dir: Path, fmt: str = 'webp',
+                 cache_dir: Path | None = DEFAULT_CACHE_DIR):
+        self.source_dir = source_dir
+        self.output_dir = output_dir
+        self.asset_dir = asset_dir
+        self.fmt = fmt
+        self.settings = f'{fmt}:{IMAGE_BOX[0]}x{IMAGE_BOX[1]}:q{IMAGE_QUALITY}'
+        self.conn = open_slide_cache(cache_dir) if cache_dir else None
+        if self.conn:
+            self.conn.executescript(IMAGE_CACHE_SCHEMA)
+        self.seen = {}
+
+    def close(self):
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def rewrite(self, html: str) -> str:
+        return IMG_TAG_RE.sub(self._rewrite_tag, html)
+
+    def _rewrite_tag(self, m: re.Match) -> str:
+        tag = m.group(0)
+        src = IMG_SRC_RE.search(tag)
+        if not src:
+            return tag
+        result = self.process(src.group(1))
+        if not result:
+            return tag
+        url, width, height = result
+        tag = tag[:src.start(1)] + url + tag[src.end(1):]
+        if 'width=' not in tag and 'height=' not in tag:
+            tag = tag[:-1].rstrip('/ ') + f' width="{width}" height="{height}">'
+        return tag
+
+    def process(self, src: str):
+        """Return (url, width, height) for an optimized copy of src, or None to leave it as-is."""
+        if src in self.seen:
+            return self.seen[src]
+        self.seen[src] = result = self._process(src)
+        return result
+
+    def _process(self, src: str):
+        if '://' in src or src.startswith(('data:', '/', '#')):
+            return None
+        path = self.source_dir / unquote(src.split('?', 1)[0].split('#', 1)[0])
+        if path.suffix.lower() not in RASTER_SUFFIXES:
+            return None
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+
+        key = f'{path.resolve()}\0{st.st_mtime_ns}\0{st.st_size}\0{self.settings}'
+        row = self.conn.execute('SELECT file, width, height FROM images WHERE key = ?', (key,)).fetchone() \
+            if self.conn else None
+        if row and (self.asset_dir / row[0]).exists():
+            name, width, height = row
+        else:
+            try:
+                name, width, height = self._encode(path)
+            except (OSError, ValueError) as e:
+                print(f'Warning: image {src} left as-is ({e})', file=sys.stderr)
+                return None
+            if self.conn:
+                with self.conn:
+                    self.conn.execute('INSERT OR REPLACE INTO images (key, file, width, height) VALUES (?, ?, ?, ?)',
+                                      (key, name, width, height))
+        url = quote(Path(os.path.relpath(self.asset_dir / name, self.output_dir)).as_posix())
+        return url, width, height
+
+    def _encode(self, path: Path):
+        data = path.read_bytes()
+        digest = hashlib.sha256(data + self.settings.encode()).hexdigest()[:12]
+        name = f'{path.stem}.{digest}.{self.fmt}'
+        target = self.asset_dir / name
+        with Image.open(io.BytesIO(data)) as im:
+            im = ImageOps.exif_transpose(im)
+            im.thumbnail(IMAGE_BOX, Image.LANCZOS)
+            if im.mode not in ('RGB', 'RGBA'):
+                im = im.convert('RGBA' if 'A' in im.getbands() or 'transparency' in im.info else 'RGB')
+            width, height = im.size
+            if not target.exists():
+                self.asset_dir.mkdir(parents=True, exist_ok=True)
+                tmp = target.with_name(f'.{name}.{os.getpid()}.tmp')
+                im.save(tmp, IMAGE_FORMATS[self.fmt], quality=IMAGE_QUALITY)
+                os.replace(tmp, target)
+        return name, width, height
+
+
 # ---------------------------------------------------------------------------
 # Build
 # ---------------------------------------------------------------------------
 
-def build_slides_html(md_text: str, title: str = '', lang: str = 'ja') -> str:
-    meta, body = parse_frontmatter(md_text)
-    title = title or meta.get('title', 'Slides')
-    lang = lang or meta.get('lang', 'ja')
+SLIDE_SEP_RE = re.compile(r'\n---\n')
+LAYOUT_HINT_RE = re.compile(r'<!--\s*layout:\s*(\w+)\s*-->')
+
+
+class Slide:
+    """One node of the deck AST: a slide's Markdown (layout hint removed), hint and position.
+
+    blocks (the tokenize_blocks output) is computed on first use, so a slide
+    served from the render cache is never tokenized. It is kept for the other
+    back ends only with keep_blocks; an HTML-only build drops each slide's
+    tokens once it is rendered, so memory stays bounded by the batch.
+    """
+
+    def __init__(self, index: int, markdown: str, hint: str, position: str, keep_blocks: bool = False):
+        self.index = index
+        self.markdown = markdown
+        self.hint = hint
+        self.position = position
+        self.keep_blocks = keep_blocks
+        self._blocks = None
 
-    chunks = re.split(r'\n---\n', body)
+    @property
+    def blocks(self) -> list:
+        if self._blocks is not None:
+            return self._blocks
+        blocks = list(tokenize_blocks(self.markdown))
+        if self.keep_blocks:
+            self._blocks = blocks
+        return blocks
+
+
+def parse_deck(md_text: str, keep_blocks: bool = False) -> tuple[dict, list]:
+    """Parse a deck once into (frontmatter, [Slide, ...]) for the HTML and export back ends.
+
+    keep_blocks makes each slide keep its tokens after first use (set it when
+    an export reads the same slides after the HTML).
+    """
+    meta, body = parse_frontmatter(md_text)
+    chunks = SLIDE_SEP_RE.split(body)
     chunks = [c.strip() for c in chunks if c.strip()]
 
-    slides_html = []
+    total = len(chunks)
+    slides = []
     for i, chunk in enumerate(chunks):
         # Check for layout hint comment
         hint = ''
-        hm = re.search(r'<!--\s*layout:\s*(\w+)\s*-->', chunk)
+        hm = LAYOUT_HINT_RE.search(chunk)
         if hm:
             hint = hm.group(1)
             chunk = chunk[:hm.start()] + chunk[hm.end():]
+        slides.append(Slide(i, chunk.strip(), hint, slide_position(i, total), keep_blocks))
+    return meta, slides
 
-        inner_html = md_to_html(chunk.strip())
-        layout_cls, bg_cls = classify_slide(inner_html, i, len(chunks), hint)
 
-        active = ' active' if i == 0 else ''
-        slide = f'''<div class="slide {layout_cls}{active}">
+def render_slide(slide: Slide, total: int, table_page_rows: int = 0) -> str:
+    """Render one slide to its <div class="slide"> block."""
+    inner_html = blocks_to_html(slide.blocks, table_page_rows)
+    layout_cls, bg_cls = classify_slide(inner_html, slide.index, total, slide.hint)
+
+    active = ' active' if slide.index == 0 else ''
+    return f'''<div class="slide {layout_cls}{active}">
   <div class="slide-inner">
     <div class="slide-bg {bg_cls}"></div>
     <div class="slide-content">
@@ -255,85 +792,421 @@ def build_slides_html(md_text: str, title: str = '', lang: str = 'ja') -> str:
     </div>
   </div>
 </div>'''
-        slides_html.append(slide)
-
-    # Read the design-spec template
-    # CHANGED(2026-03-24) — kesson-space path: docs/rich-slides-design-spec.md
-    spec_path = Path(__file__).parent.parent / 'docs' / 'rich-slides-design-spec.md'
-    if spec_path.exists():
-        spec_text = spec_path.read_text()
-        # Extract the HTML shell from the code block
-        shell_match = re.search(r'```html\n(<!DOCTYPE html>.*?)</body>\s*</html>\s*```', spec_text, re.DOTALL)
-        if shell_match:
-            template = shell_match.group(1) + '</body>\n</html>'
-            # Insert slides
-            template = template.replace('  <!-- SLIDES GO HERE -->', '\n'.join(slides_html))
-            template = template.replace('{{TITLE}}', escape(title))
-            template = template.replace('lang="ja"', f'lang="{lang}"')
-            return template
+
+
+def iter_rendered_slides(slides: list, cache_dir: Path | None = DEFAULT_CACHE_DIR, table_page_rows: int = 0):
+    """Yield each slide's HTML in order, rendering cache misses in batches of SLIDE_CACHE_BATCH."""
+    total = len(slides)
+    options = f'table_page_rows={table_page_rows}' if table_page_rows else ''
+    conn = open_slide_cache(cache_dir) if cache_dir else None
+    try:
+        for start in range(0, total, SLIDE_CACHE_BATCH):
+            batch = slides[start:start + SLIDE_CACHE_BATCH]
+            keys = [slide_cache_key(slide.markdown, slide.hint, slide.position, options) for slide in batch] \
+                if conn else [None] * len(batch)
+            cached = lookup_slides(conn, keys) if conn else {}
+            rendered = {}
+            for key, slide in zip(keys, batch):
+                html = cached.get(key) or rendered.get(key)
+                if html is None:
+                    html = render_slide(slide, total, table_page_rows)
+                    if key:
+                        rendered[key] = html
+                yield html
+            if conn:
+                try:
+                    store_slides(conn, rendered)
+                except sqlite3.Error as e:
+                    print(f'Warning: could not update slide cache ({e})', file=sys.stderr)
+    finally:
+        if conn:
+            conn.close()
+
+
+def iter_slides_html(md_text: str, title: str = '', lang: str = 'ja', **options):
+    """Parse md_text and yield its deck HTML piece by piece (see render_deck_html)."""
+    meta, slides = parse_deck(md_text)
+    yield from render_deck_html(meta, slides, title, lang, **options)
+
+
+def render_deck_html(meta: dict, slides: list, title: str = '', lang: str = 'ja',
+                     cache_dir: Path | None = DEFAULT_CACHE_DIR, images: ImageOptimizer | None = None,
+                     lazy: int = 0, output_path: Path | None = None, lazy_bundle: bool = False,
+                     table_page_rows: int = 0):
+    """HTML back end: yield template prefix, each slide as it is rendered, suffix.
+
+    With lazy > 0 only the first `lazy` slides are inlined; the rest are
+    written next to output_path (see split_lazy_slides) and fetched by the
+    browser on navigation. images, if given, rewrites local <img> references
+    to optimized copies. table_page_rows is passed on to md_to_html.
+    """
+    title = title or meta.get('title', 'Slides')
+    lang = lang or meta.get('lang', 'ja')
 
     # Fallback: minimal shell
-    return _fallback_shell(slides_html, title, lang)
+    template = load_shell_template(cache_dir=cache_dir) or FALLBACK_TEMPLATE
+    rendered = iter_rendered_slides(slides, cache_dir, table_page_rows)
+    if images:
+        rendered = map(images.rewrite, rendered)
+    body_end = ''
+    if lazy and len(slides) > lazy:
+        rendered = split_lazy_slides(rendered, lazy, lazy_asset_path(output_path, lazy_bundle), lazy_bundle)
+        body_end = lazy_loader_script(output_path, lazy_bundle)
+    elif lazy:
+        rendered = map(lazy_images, rendered)
+    yield from iter_shell_template(template, rendered, title, lang, body_end)
+
 
+def build_slides_html(md_text: str, title: str = '', lang: str = 'ja',
+                      cache_dir: Path | None = DEFAULT_CACHE_DIR, table_page_rows: int = 0) -> str:
+    return ''.join(iter_slides_html(md_text, title, lang, cache_dir=cache_dir, table_page_rows=table_page_rows))
 
-def _fallback_shell(slides_html: list, title: str, lang: str) -> str:
-    return f'''<!DOCTYPE html>
-<html lang="{lang}">
+
+FALLBACK_SHELL = '''<!DOCTYPE html>
+<html lang="ja">
 <head>
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
-<title>{escape(title)}</title>
+<title>{{TITLE}}</title>
 <style>
-*, *::before, *::after {{ box-sizing: border-box; margin: 0; padding: 0; }}
-html, body {{ width: 100%; height: 100%; background: #0a0e17; color: #f1f5f9; font-family: "Inter", "Noto Sans JP", system-ui, sans-serif; overflow: hidden; }}
-.deck {{ width: 100vw; height: 100vh; position: relative; }}
-.slide {{ position: absolute; inset: 0; display: flex; align-items: center; justify-content: center; opacity: 0; visibility: hidden; transition: opacity 0.28s ease, visibility 0.28s ease; }}
-.slide.active {{ opacity: 1; visibility: visible; }}
-.slide-inner {{ width: min(92vw, calc(88vh * 16 / 9)); aspect-ratio: 16 / 9; border-radius: 16px; border: 1px solid rgba(148,163,184,0.14); overflow: hidden; position: relative; box-shadow: 0 24px 80px rgba(0,0,0,0.5); }}
-.slide-bg {{ position: absolute; inset: 0; background: linear-gradient(180deg, #0c1220, #0a0e17); }}
-.slide-content {{ position: relative; z-index: 1; width: 100%; height: 100%; padding: 3.5rem 4rem; display: flex; flex-direction: column; }}
-h1 {{ font-size: 2.5rem; font-weight: 700; }}
-h2 {{ font-size: 1.8rem; font-weight: 600; margin-bottom: 1rem; }}
-p {{ font-size: 1rem; line-height: 1.8; margin-bottom: 0.8rem; }}
+*, *::before, *::after { box-sizing: border-box; margin: 0; padding: 0; }
+html, body { width: 100%; height: 100%; background: #0a0e17; color: #f1f5f9; font-family: "Inter", "Noto Sans JP", system-ui, sans-serif; overflow: hidden; }
+.deck { width: 100vw; height: 100vh; position: relative; }
+.slide { position: absolute; inset: 0; display: flex; align-items: center; justify-content: center; opacity: 0; visibility: hidden; transition: opacity 0.28s ease, visibility 0.28s ease; }
+.slide.active { opacity: 1; visibility: visible; }
+.slide-inner { width: min(92vw, calc(88vh * 16 / 9)); aspect-ratio: 16 / 9; border-radius: 16px; border: 1px solid rgba(148,163,184,0.14); overflow: hidden; position: relative; box-shadow: 0 24px 80px rgba(0,0,0,0.5); }
+.slide-bg { position: absolute; inset: 0; background: linear-gradient(180deg, #0c1220, #0a0e17); }
+.slide-content { position: relative; z-index: 1; width: 100%; height: 100%; padding: 3.5rem 4rem; display: flex; flex-direction: column; }
+h1 { font-size: 2.5rem; font-weight: 700; }
+h2 { font-size: 1.8rem; font-weight: 600; margin-bottom: 1rem; }
+p { font-size: 1rem; line-height: 1.8; margin-bottom: 0.8rem; }
 </style>
 </head>
 <body>
 <div class="deck" id="deck">
-{chr(10).join(slides_html)}
+  <!-- SLIDES GO HERE -->
 </div>
 <script>
 const slides=document.querySelectorAll('.slide');let cur=0;
-function show(i){{slides.forEach((s,idx)=>s.classList.toggle('active',idx===i));}}
-function go(d){{const n=Math.max(0,Math.min(slides.length-1,cur+d));if(n!==cur){{cur=n;show(cur);}}}}
-document.addEventListener('keydown',e=>{{if(e.key==='ArrowRight'||e.key===' '){{e.preventDefault();go(1);}}if(e.key==='ArrowLeft'){{e.preventDefault();go(-1);}}}}); show(0);
+function show(i){slides.forEach((s,idx)=>s.classList.toggle('active',idx===i));}
+function go(d){const n=Math.max(0,Math.min(slides.length-1,cur+d));if(n!==cur){cur=n;show(cur);}}
+document.addEventListener('keydown',e=>{if(e.key==='ArrowRight'||e.key===' '){e.preventDefault();go(1);}if(e.key==='ArrowLeft'){e.preventDefault();go(-1);}}); show(0);
 </script>
 </body>
 </html>'''
+FALLBACK_TEMPLATE = split_shell_template(FALLBACK_SHELL)
+
+
+# ---------------------------------------------------------------------------
+# Outline and search-index export
+# ---------------------------------------------------------------------------
+
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def _plain_token(m: re.Match) -> str:
+    kind = m.lastgroup
+    if kind == 'src':
+        return m['alt']
+    if kind == 'href':
+        return inline_text(m['text'])
+    if kind == 'code':
+        return m['code']
+    return inline_text(m[kind])
+
+
+def inline_text(text: str) -> str:
+    """Inline markdown to plain text: markup and raw HTML tags dropped, link text and image alt kept."""
+    return INLINE_RE.sub(_plain_token, HTML_TAG_RE.sub('', text))
+
+
+def block_text(kind: str, value) -> str:
+    if kind == 'heading':
+        return inline_text(value[1])
+    if kind == 'code':
+        return '\n'.join(value)
+    if kind == 'table':
+        rows = (row.strip('|') for row in value)
+        return '\n'.join(' | '.join(inline_text(c.strip()) for c in row.split('|'))
+                         for row in rows if not TABLE_SEP_ROW_RE.fullmatch(row))
+    if kind == 'blank':
+        return ''
+    return inline_text(value)
+
+
+def slide_title(slide: Slide) -> str:
+    """Text of the slide's first heading, or '' if it has none."""
+    return next((inline_text(value[1]) for kind, value in slide.blocks if kind == 'heading'), '')
+
+
+def render_outline(meta: dict, slides: list, title: str = '', lang: str = 'ja') -> dict:
+    """JSON outline back end: per-slide title, layout hint and heading tree."""
+    return {
+        'title': title or meta.get('title', 'Slides'),
+        'lang': lang or meta.get('lang', 'ja'),
+        'slides': [{
+            'index': slide.index,
+            'title': slide_title(slide),
+            'layout': slide.hint,
+            'headings': [{'level': value[0], 'text': inline_text(value[1])}
+                         for kind, value in slide.blocks if kind == 'heading'],
+        } for slide in slides],
+    }
+
+
+def render_search_index(meta: dict, slides: list, title: str = '', lang: str = 'ja') -> dict:
+    """Search-index back end: the plain text of every slide."""
+    return {
+        'title': title or meta.get('title', 'Slides'),
+        'lang': lang or meta.get('lang', 'ja'),
+        'slides': [{
+            'index': slide.index,
+            'title': slide_title(slide),
+            'text': '\n'.join(text for text in (block_text(kind, value) for kind, value in slide.blocks) if text),
+        } for slide in slides],
+    }
+
+
+# format → (output suffix, back end); 'html' is the streamed deck itself
+EXPORT_FORMATS = {
+    'outline': ('.outline.json', render_outline),
+    'search': ('.search.json', render_search_index),
+}
 
 
 # ---------------------------------------------------------------------------
 # CLI
 # ---------------------------------------------------------------------------
 
+def build_deck(input_path: str, output_path: str, title: str = '', lang: str = 'ja',
+               cache_dir: Path | None = DEFAULT_CACHE_DIR, lazy: int = 0, lazy_bundle: bool = False,
+               image_format: str = '', table_page_rows: int = 0, formats: tuple = ('html',)) -> list:
+    """Convert one Markdown file to an HTML deck and/or exports. Returns [(path, characters), ...].
+
+    The deck is parsed once and every format in `formats` renders from the
+    same slides. The HTML is streamed slide by slide to output_path ('-' for
+    stdout); a file output is written under a temporary name and moved into
+    place. Exports go next to it (see EXPORT_FORMATS). image_format ('webp'
+    or 'avif') turns on the image optimization stage; optimized copies go to
+    IMAGE_ASSET_DIR next to the output.
+    """
+    meta, slides = parse_deck(Path(input_path).read_text(encoding='utf-8'),
+                              keep_blocks=any(fmt in EXPORT_FORMATS for fmt in formats))
+    written = []
+    if 'html' in formats:
+        written.append((output_path, _write_deck_html(meta, slides, input_path, output_path, title, lang, cache_dir,
+                                                      lazy, lazy_bundle, image_format, table_page_rows)))
+    for fmt in formats:
+        if fmt in EXPORT_FORMATS:
+            suffix, render = EXPORT_FORMATS[fmt]
+            path = Path(output_path).with_suffix(suffix)
+            text = json.dumps(render(meta, slides, title, lang), ensure_ascii=False, indent=2) + '\n'
+            path.write_text(text, encoding='utf-8')
+            written.append((path, len(text)))
+    return written
+
+
+def _write_deck_html(meta, slides, input_path, output_path, title, lang, cache_dir, lazy, lazy_bundle,
+                     image_format, table_page_rows) -> int:
+    output_dir = Path.cwd() if output_path == '-' else Path(output_path).parent
+    images = None
+    if image_format:
+        images = ImageOptimizer(Path(input_path).parent, output_dir, output_dir / IMAGE_ASSET_DIR,
+                                image_format, cache_dir)
+    options = dict(cache_dir=cache_dir, images=images, table_page_rows=table_page_rows)
+    try:
+        if output_path == '-':
+            return write_pieces(sys.stdout, render_deck_html(meta, slides, title, lang, **options))
+        output_path = Path(output_path)
+        pieces = render_deck_html(meta, slides, title, lang, lazy=lazy, output_path=output_path,
+                                  lazy_bundle=lazy_bundle, **options)
+        tmp = output_path.with_name(f'.{output_path.name}.{os.getpid()}.tmp')
+        try:
+            with open(tmp, 'w', encoding='utf-8') as fp:
+                size = write_pieces(fp, pieces)
+            os.replace(tmp, output_path)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return size
+    finally:
+        if images:
+            images.close()
+
+
+def write_pieces(fp, pieces) -> int:
+    size = 0
+    for piece in pieces:
+        fp.write(piece)
+        size += len(piece)
+    return size
+
+
+def expand_inputs(patterns: list) -> list:
+    """Resolve files, directories (searched recursively for *.md) and glob patterns.
+
+    Returns de-duplicated paths in argument order; a plain path that does not
+    exist is kept so the build reports it.
+    """
+    found = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = sorted(path.rglob('*.md'))
+        elif any(c in pattern for c in '*?['):
+            matches = sorted(Path(p) for p in glob.glob(pattern, recursive=True) if Path(p).is_file())
+        else:
+            matches = [path]
+        for m in matches:
+            found.setdefault(m, None)
+    return list(found)
+
+
+def build_decks(jobs: list, workers: int, **options) -> int:
+    """Build (input, output) pairs, fanning out over a process pool. Returns the number of failures.
+
+    options are passed through to build_deck.
+    """
+    build = partial(_try_build, **options)
+    srcs = [src for src, _ in jobs]
+    dsts = [dst for _, dst in jobs]
+    if workers > 1 and len(jobs) > 1:
+        # Imported here: the process pool machinery roughly doubles startup for single-deck runs
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            return _report_builds(jobs, pool.map(build, srcs, dsts))
+    return _report_builds(jobs, map(build, srcs, dsts))
+
+
+def _try_build(input_path, output_path, **options):
+    """build_deck that reports any per-deck failure instead of aborting the batch.
+
+    The error comes back as a message: exception objects do not always survive
+    the trip back from a worker process.
+    """
+    try:
+        return build_deck(str(input_path), str(output_path), **options), None
+    except (OSError, UnicodeDecodeError) as e:
+        return [], str(e)
+    except Exception as e:
+        return [], f'{type(e).__name__}: {e}'
+
+
+def _report_builds(jobs: list, results) -> int:
+    failures = 0
+    for (src, _), (written, error) in zip(jobs, results):
+        if error:
+            failures += 1
+            print(f'Error: {src}: {error}', file=sys.stderr)
+        for dst, size in written:
+            print(f'Generated: {dst} ({size:,} bytes)', file=sys.stderr if str(dst) == '-' else sys.stdout)
+    return failures
+
+
+def _mtime(path: Path):
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def watch(patterns: list, seen: dict, outputs: dict, workers: int, interval: float, **options):
+    """Poll the inputs and rebuild decks whose source (or the design spec) changed.
+
+    seen maps each input to the mtime it had when it was last built; outputs is
+    the input -> output mapping fixed at startup (so -o stays bound to the deck
+    it was given for), and decks that appear later are written next to their source.
+    """
+    spec_mtime = _mtime(SPEC_PATH)
+    print(f'Watching {", ".join(patterns)} (Ctrl-C to stop)', file=sys.stderr)
+    try:
+        while True:
+            time.sleep(interval)
+            spec_now = _mtime(SPEC_PATH)
+            spec_changed = spec_now != spec_mtime
+            spec_mtime = spec_now
+            current = {src: _mtime(src) for src in expand_inputs(patterns)}
+            changed = [src for src, mtime in current.items()
+                       if mtime is not None and (spec_changed or seen.get(src) != mtime)]
+            seen = current
+            if changed:
+                build_decks([(src, outputs.get(src) or src.with_suffix('.html')) for src in changed],
+                            workers, **options)
+    except KeyboardInterrupt:
+        print('', file=sys.stderr)
+
+
+def _output_pairs(inputs: list, output: str = '') -> list:
+    if output and len(inputs) == 1:
+        return [(inputs[0], Path(output))]
+    return [(src, src.with_suffix('.html')) for src in inputs]
+
+
 def main():
     parser = argparse.ArgumentParser(description='Generate rich HTML slides from Markdown')
-    parser.add_argument('input_positional', nargs='?', help='Input Markdown file (positional)')
+    parser.add_argument('input_positional', nargs='*',
+                        help='Input Markdown files, directories or glob patterns (positional)')
     parser.add_argument('--input', '-i', default='', help='Input Markdown file')
-    parser.add_argument('--output', '-o', default='', help='Output HTML file')
+    parser.add_argument('--output', '-o', default='', help="Output HTML file, '-' for stdout (single input only)")
     parser.add_argument('--title', '-t', default='', help='Presentation title')
     parser.add_argument('--lang', '-l', default='ja', help='Language code')
+    parser.add_argument('--cache-dir', default=str(DEFAULT_CACHE_DIR), help='Directory for the build cache')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the on-disk build cache')
+    parser.add_argument('--jobs', '-j', type=int, default=0, help='Worker processes for batch builds (0 = CPU count)')
+    parser.add_argument('--watch', '-w', action='store_true', help='Rebuild decks whenever their source changes')
+    parser.add_argument('--interval', type=float, default=0.5, help='Polling interval in seconds for --watch')
+    parser.add_argument('--lazy', type=int, default=0, metavar='N',
+                        help='Inline only the first N slides; load the rest on navigation from <output>.slides/')
+    parser.add_argument('--lazy-bundle', action='store_true',
+                        help='With --lazy, write deferred slides to one <output>.slides.json instead of fragment files')
+    parser.add_argument('--optimize-images', nargs='?', const='webp', default='', choices=sorted(IMAGE_FORMATS),
+                        metavar='FORMAT', help='Resize local images to the slide box and transcode them '
+                        f'(webp or avif, default webp) into {IMAGE_ASSET_DIR}/ next to the output; needs Pillow')
+    parser.add_argument('--table-page-rows', type=int, default=0, metavar='N',
+                        help='Paginate tables with more than N body rows (0 = never)')
+    parser.add_argument('--formats', default='html',
+                        help='Comma-separated outputs rendered from one parse: html, outline (<output>.outline.json), '
+                        'search (<output>.search.json)')
     args = parser.parse_args()
+    cache_dir = None if args.no_cache else Path(args.cache_dir)
 
-    input_path = args.input or args.input_positional
-    if not input_path:
+    patterns = ([args.input] if args.input else []) + args.input_positional
+    if not patterns:
         parser.error('Input file is required (positional or --input)')
+    inputs = expand_inputs(patterns)
+    if not inputs:
+        parser.error(f'No Markdown files matched: {" ".join(patterns)}')
+    if args.output and len(inputs) > 1:
+        parser.error('--output can only be used with a single input')
+    if args.lazy < 0:
+        parser.error('--lazy must not be negative')
+    if args.lazy and args.output == '-':
+        parser.error('--lazy writes slide fragments next to the output and cannot stream to stdout')
+
+    formats = tuple(f.strip() for f in args.formats.split(',') if f.strip())
+    unknown = [f for f in formats if f != 'html' and f not in EXPORT_FORMATS]
+    if unknown or not formats:
+        parser.error(f'Unknown --formats value: {args.formats}')
+    if args.output == '-' and set(formats) - {'html'}:
+        parser.error('Exports are written next to the output and cannot be combined with -o -')
+    if args.optimize_images:
+        if Image is None:
+            parser.error('--optimize-images requires Pillow (pip install pillow)')
+        Image.init()
+        if IMAGE_FORMATS[args.optimize_images] not in Image.SAVE:
+            parser.error(f'This Pillow build cannot write {args.optimize_images}')
 
-    output_path = args.output or str(Path(input_path).with_suffix('.html'))
+    workers = args.jobs or os.cpu_count() or 1
+    seen = {src: _mtime(src) for src in inputs}
+    options = dict(title=args.title, lang=args.lang, cache_dir=cache_dir, lazy=args.lazy,
+                   lazy_bundle=args.lazy_bundle, image_format=args.optimize_images,
+                   table_page_rows=args.table_page_rows, formats=formats)
+    jobs = _output_pairs(inputs, args.output)
+    failures = build_decks(jobs, workers, **options)
 
-    md_text = Path(input_path).read_text(encoding='utf-8')
-    html = build_slides_html(md_text, title=args.title, lang=args.lang)
-    Path(output_path).write_text(html, encoding='utf-8')
-    print(f'Generated: {output_path} ({len(html):,} bytes)')
+    if args.watch:
+        watch(patterns, seen, dict(jobs), workers, args.interval, **options)
+    elif failures:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -9,20 +9,51 @@ Usage:
     python scripts/generate-sessions.py --repo kesson-space # 指定リポジトリのみ
     python scripts/generate-sessions.py --since 2026-02-01  # 日付指定
     python scripts/generate-sessions.py --dry-run           # 書き出さずに標準出力
+    python scripts/generate-sessions.py --incremental       # 前回カーソル以降のコミットのみ取り込み
+    python scripts/generate-sessions.py --columnar          # numpy で分割・集計（要 numpy）
+    python scripts/generate-sessions.py --cache             # パース済みコミットを SQLite にキャッシュ
+    python scripts/generate-sessions.py --cache-only        # git を呼ばずキャッシュだけで再集計
+    python scripts/generate-sessions.py --shard month       # 月ごとの分割ファイル + index.json も出力
+    python scripts/generate-sessions.py --backend pygit2    # git を fork せず libgit2 で読む（要 pygit2）
+    python scripts/generate-sessions.py --profile           # ステージ別の時間・カウンタを表示
+    python scripts/generate-sessions.py --profile-out trace.json   # Chrome trace（.json 以外は cProfile の pstats）
 """
 
 import subprocess
+import sqlite3
+import heapq
 import json
+import re
 import sys
 import os
+import threading
+import time
+import cProfile
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 
+# numpy があれば --columnar でセッション分割・集計を列指向で行う（任意依存）
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# pygit2 があれば --backend pygit2 でオブジェクトストアをプロセス内から読む（任意依存）
+try:
+    import pygit2
+except ImportError:
+    pygit2 = None
+
 SCRIPT_DIR = Path(__file__).parent
 CONFIG_PATH = SCRIPT_DIR / "devlog-config.json"
 PROJECT_ROOT = SCRIPT_DIR.parent
+DEFAULT_STATE_PATH = ".devlog-state.json"  # 公開する assets/ の外。sessions.json と一緒にコミットする
+DEFAULT_COMMIT_CACHE_PATH = ".devlog-cache.sqlite3"
+DEFAULT_PAGE_SIZE = 50
 
 DEFAULT_CATEGORIES = {
     "shader":   {"pattern": ["shaders/", ".glsl"],      "color": "#1a237e"},
@@ -54,85 +85,343 @@ def check_approval(repo_name, config, repo_def=None):
     print(f"  ✗ {repo_name} は approved_repos に含まれない。スキップ。", file=sys.stderr)
     return None
 
-def get_git_log(repo_path, since=None):
+class Profiler:
+    """--profile 用のステージ計測とカウンタ。無効時は何も記録しない"""
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self.counters = Counter()
+        self.lock = threading.Lock()
+        self.t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, **args):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self.lock:
+                self.events.append({"name": name, "start": start - self.t0, "dur": end - start,
+                                    "tid": threading.get_ident(), "args": args})
+
+    def count(self, name, n=1):
+        if self.enabled:
+            with self.lock:
+                self.counters[name] += n
+
+    def summary(self):
+        totals = {}
+        for ev in self.events:
+            calls, secs = totals.get(ev["name"], (0, 0.0))
+            totals[ev["name"]] = (calls + 1, secs + ev["dur"])
+        lines = ["", "--- profile ---"]
+        for name, (calls, secs) in totals.items():
+            lines.append(f"  {name:<24} {secs * 1000:10.1f} ms  ({calls} calls)")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name:<24} {value:>10,}")
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """chrome://tracing / Perfetto で開ける Trace Event Format"""
+        pid = os.getpid()
+        events = [
+            {"name": ev["name"], "ph": "X", "ts": round(ev["start"] * 1e6, 1), "dur": round(ev["dur"] * 1e6, 1),
+             "pid": pid, "tid": ev["tid"], "args": ev["args"]}
+            for ev in self.events
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": dict(self.counters)}
+
+PROFILER = Profiler()
+
+GIT_LOG_FORMAT = "%x1e%H%x1f%aI%x1f%at%x1f%ct%x1f%an%x1f%P%x1f%s"
+READ_CHUNK_SIZE = 1 << 16
+
+def iter_nul_records(stream, chunk_size=READ_CHUNK_SIZE):
+    buf = b""
+    bytes_read = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk: break
+        bytes_read += len(chunk)
+        buf += chunk
+        *records, buf = buf.split(b"\0")
+        yield from records
+    if buf:
+        yield buf
+    PROFILER.count("git_bytes_read", bytes_read)
+
+def parse_git_log(records):
+    """`git log -z --numstat --format=GIT_LOG_FORMAT` のレコード列 → コミット dict の generator
+
+    ヘッダは \x1e で始まり、numstat は `ins\tdel\tpath`。
+    リネームは path が空で、直後に旧パス・新パスの2レコードが続く（新パスを採用）。
+    """
+    commit = None
+    rename_pending = 0
+    for raw in records:
+        record = raw.decode("utf-8", errors="replace").lstrip("\n")
+        if record.startswith("\x1e"):
+            if commit: yield commit
+            parts = record[1:].split("\x1f", 6)
+            if len(parts) < 7:
+                commit = None
+                continue
+            commit = {"hash": parts[0], "datetime": parts[1], "authored": int(parts[2]), "committed": int(parts[3]),
+                      "message": parts[6], "author": parts[4], "parents": parts[5].split(),
+                      "files": [], "insertions": 0, "deletions": 0}
+            rename_pending = 0
+        elif commit is None:
+            continue
+        elif rename_pending:
+            rename_pending -= 1
+            if rename_pending == 0: commit["files"].append(record)
+        else:
+            parts = record.split("\t", 2)
+            if len(parts) != 3: continue
+            commit["insertions"] += int(parts[0]) if parts[0] != "-" else 0
+            commit["deletions"] += int(parts[1]) if parts[1] != "-" else 0
+            if parts[2]:
+                commit["files"].append(parts[2])
+            else:
+                rename_pending = 2
+    if commit: yield commit
+
+def load_state(state_path):
+    if not state_path.exists():
+        return {"repos": {}}
+    with open(state_path) as f:
+        state = json.load(f)
+    state.setdefault("repos", {})
+    return state
+
+def save_state(state_path, state):
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    state_path.write_text(json.dumps(state, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+def load_existing_sessions(output_path):
+    if not output_path.exists():
+        return []
+    with open(output_path) as f:
+        return json.load(f)
+
+def is_ancestor(repo_path, commit_hash):
+    cmd = ["git", "-C", str(Path(repo_path).expanduser()), "merge-base", "--is-ancestor", commit_hash, "HEAD"]
+    return subprocess.run(cmd, capture_output=True).returncode == 0
+
+def get_git_log(repo_path, since=None, rev_range=None):
+    """git log を1回だけ走査し、パイプから逐次パースしたコミットを yield する"""
     repo_path = Path(repo_path).expanduser()
     if not (repo_path / ".git").exists():
         print(f"  ✗ .git not found: {repo_path}", file=sys.stderr)
-        return []
+        return
 
-    cmd = ["git", "-C", str(repo_path), "log", "--format=%H|%aI|%s|%an", "--reverse"]
+    cmd = ["git", "-C", str(repo_path), "log", "-z", "--numstat", f"--format={GIT_LOG_FORMAT}", "--reverse"]
     if since:
         cmd.append(f"--since={since}")
+    if rev_range:
+        cmd.append(rev_range)
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"  ✗ git log failed: {result.stderr}", file=sys.stderr)
-        return []
+    parsed = 0
+    with PROFILER.stage("git_log", repo=str(repo_path), rev_range=rev_range or ""):
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            for commit in parse_git_log(iter_nul_records(proc.stdout)):
+                parsed += 1
+                yield commit
+        finally:
+            PROFILER.count("commits_parsed", parsed)
+            PROFILER.count("git_subprocesses")
+            returncode, stderr = finish_git_log(proc)
+    # 最後まで読んだのに git が失敗していたら、途中までの結果は使わせない
+    if returncode != 0:
+        raise GitLogError(f"git log failed ({returncode}): {stderr.strip()}")
 
-    commits = []
-    for line in result.stdout.strip().split("\n"):
-        if not line: continue
-        parts = line.split("|", 3)
-        if len(parts) < 4: continue
-        commits.append({"hash": parts[0], "datetime": parts[1], "message": parts[2], "author": parts[3]})
+class GitLogError(RuntimeError):
+    """git log が非0で終了した（それまでに yield したコミットは不完全）"""
 
-    cmd_stat = ["git", "-C", str(repo_path), "log", "--format=%H", "--numstat", "--reverse"]
-    if since:
-        cmd_stat.append(f"--since={since}")
-
-    result_stat = subprocess.run(cmd_stat, capture_output=True, text=True)
-    if result_stat.returncode == 0:
-        current_hash = None
-        file_stats = {}
-        for line in result_stat.stdout.strip().split("\n"):
-            line = line.strip()
-            if not line: continue
-            if len(line) == 40 and all(c in "0123456789abcdef" for c in line):
-                current_hash = line
-                file_stats[current_hash] = []
-            elif current_hash and "\t" in line:
-                parts = line.split("\t")
-                if len(parts) == 3:
-                    ins = int(parts[0]) if parts[0] != "-" else 0
-                    dels = int(parts[1]) if parts[1] != "-" else 0
-                    file_stats[current_hash].append((ins, dels, parts[2]))
-
-        for commit in commits:
-            stats = file_stats.get(commit["hash"], [])
-            commit["files"] = [s[2] for s in stats]
-            commit["insertions"] = sum(s[0] for s in stats)
-            commit["deletions"] = sum(s[1] for s in stats)
-
-    return commits
+def finish_git_log(proc):
+    proc.stdout.close()
+    stderr = proc.stderr.read().decode("utf-8", errors="replace")
+    proc.stderr.close()
+    return proc.wait(), stderr
+
+# ---------------------------------------------------------------------------
+# pygit2 backend — get_git_log と同じコミット dict を libgit2 から読む
+# ---------------------------------------------------------------------------
+
+def open_pygit2_repo(repo_path):
+    try:
+        repo = pygit2.Repository(str(Path(repo_path).expanduser()))
+    except (pygit2.GitError, KeyError):
+        return None
+    return None if repo.head_is_unborn else repo
+
+def pygit2_head(repo_path):
+    repo = open_pygit2_repo(repo_path)
+    return str(repo.head.target) if repo else None
+
+def pygit2_is_ancestor(repo_path, commit_hash):
+    repo = open_pygit2_repo(repo_path)
+    if repo is None:
+        return False
+    try:
+        oid = repo.revparse_single(commit_hash).id
+    except (KeyError, ValueError, pygit2.GitError):
+        return False
+    head = repo.head.target
+    return oid == head or repo.descendant_of(head, oid)
+
+def pygit2_since_reachable(repo, since_ts):
+    """git log --since と同じ集合を返す（since_reachable の pygit2 版）"""
+    keep, stack = set(), [repo.head.target]
+    while stack:
+        oid = stack.pop()
+        if oid in keep:
+            continue
+        commit = repo[oid]
+        if commit.commit_time < since_ts:
+            continue
+        keep.add(oid)
+        stack.extend(commit.parent_ids)
+    return keep
+
+def commit_subject(message):
+    """git の %s と同じく、最初の段落の行を空白でつないだもの"""
+    paragraph = message.strip().split("\n\n", 1)[0]
+    return " ".join(line.strip() for line in paragraph.splitlines())
+
+def get_pygit2_log(repo_path, since=None, rev_range=None):
+    """get_git_log の pygit2 版。fork もテキストパースもせずに同じ形のコミットを yield する
+
+    マージコミットは git log の既定どおり diff を出さない（files 空・増減 0）。
+    リネームは find_similar で検出し、新パスを採用する。
+    """
+    repo_path = Path(repo_path).expanduser()
+    repo = open_pygit2_repo(repo_path)
+    if repo is None:
+        print(f"  ✗ repository not found: {repo_path}", file=sys.stderr)
+        return
+    # git log --reverse と同じ順（同時刻のコミットも含めて一致させるため TOPOLOGICAL を併用）
+    sort = pygit2.enums.SortMode.TOPOLOGICAL | pygit2.enums.SortMode.TIME | pygit2.enums.SortMode.REVERSE
+    if rev_range:
+        spec = repo.revparse(rev_range)
+        walker = repo.walk(spec.to_object.id, sort)
+        walker.hide(spec.from_object.id)
+    else:
+        walker = repo.walk(repo.head.target, sort)
+    keep = pygit2_since_reachable(repo, resolve_since(since, repo_path)) if since else None
+
+    parsed = 0
+    with PROFILER.stage("pygit2_log", repo=str(repo_path), rev_range=rev_range or ""):
+        for commit in walker:
+            if keep is not None and commit.id not in keep:
+                continue
+            files, ins, dels = [], 0, 0
+            if len(commit.parents) <= 1:
+                if commit.parents:
+                    diff = commit.parents[0].tree.diff_to_tree(commit.tree)
+                else:
+                    diff = commit.tree.diff_to_tree(swap=True)
+                diff.find_similar()
+                files = [delta.new_file.path for delta in diff.deltas]
+                ins, dels = diff.stats.insertions, diff.stats.deletions
+            author = commit.author
+            tz = timezone(timedelta(minutes=author.offset))
+            parsed += 1
+            yield {"hash": str(commit.id), "datetime": datetime.fromtimestamp(author.time, tz).isoformat(),
+                   "authored": author.time, "committed": commit.commit_time, "message": commit_subject(commit.message),
+                   "author": author.name, "parents": [str(p) for p in commit.parent_ids],
+                   "files": files, "insertions": ins, "deletions": dels}
+    PROFILER.count("commits_parsed", parsed)
 
 def split_sessions(commits, gap_hours=3):
-    if not commits: return []
     sessions = []
-    current_session = [commits[0]]
+    current_session = []
+    prev_dt = None
     gap = timedelta(hours=gap_hours)
-    for i in range(1, len(commits)):
-        prev_dt = datetime.fromisoformat(commits[i - 1]["datetime"])
-        curr_dt = datetime.fromisoformat(commits[i]["datetime"])
-        if curr_dt - prev_dt > gap:
+    for commit in commits:
+        curr_dt = datetime.fromisoformat(commit["datetime"])
+        if current_session and curr_dt - prev_dt > gap:
             sessions.append(current_session)
-            current_session = [commits[i]]
-        else:
-            current_session.append(commits[i])
+            current_session = []
+        current_session.append(commit)
+        prev_dt = curr_dt
     if current_session:
         sessions.append(current_session)
     return sessions
 
+def split_sessions_columnar(commits, gap_hours=3):
+    """split_sessions の numpy 版。セッション境界と集計値を配列演算で求める
+
+    Returns: (sessions, totals) — totals は各セッションの insertions / deletions / duration_min
+    """
+    commits = list(commits)
+    if not commits:
+        return [], []
+    n = len(commits)
+    epoch = np.fromiter((c["authored"] for c in commits), dtype=np.int64, count=n)
+    ins = np.fromiter((c.get("insertions", 0) for c in commits), dtype=np.int64, count=n)
+    dels = np.fromiter((c.get("deletions", 0) for c in commits), dtype=np.int64, count=n)
+
+    bounds = np.flatnonzero(np.diff(epoch) > gap_hours * 3600) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.append(bounds, n)
+    total_ins = np.add.reduceat(ins, starts).tolist()
+    total_dels = np.add.reduceat(dels, starts).tolist()
+    duration_min = np.maximum(1, ((epoch[ends - 1] - epoch[starts]) / 60).astype(np.int64)).tolist()
+
+    sessions = [commits[a:b] for a, b in zip(starts.tolist(), ends.tolist())]
+    totals = [
+        {"insertions": i, "deletions": d, "duration_min": m}
+        for i, d, m in zip(total_ins, total_dels, duration_min)
+    ]
+    return sessions, totals
+
+_CLASSIFIERS = {}
+
+def compile_classifier(categories):
+    """categories を (pattern, カテゴリ名) の平坦な表に一度だけ展開した分類関数を返す
+
+    表は定義順なので「定義順で最初に部分一致したカテゴリ」という意味論はそのまま。
+    結果はパスごとにメモ化し、セッション・リポジトリをまたいで共有する。
+    """
+    table = tuple((pattern, cat_name) for cat_name, cat_def in categories.items() for pattern in cat_def["pattern"])
+    cache = {}
+
+    def classify(filepath):
+        cat = cache.get(filepath)
+        if cat is None:
+            cat = "code"
+            for pattern, name in table:
+                if pattern in filepath:
+                    cat = name
+                    break
+            cache[filepath] = cat
+        return cat
+
+    classify.cache = cache
+    return classify
+
+def get_classifier(categories):
+    entry = _CLASSIFIERS.get(id(categories))
+    if entry is None or entry[0] is not categories:
+        entry = (categories, compile_classifier(categories))
+        _CLASSIFIERS[id(categories)] = entry
+    return entry[1]
+
 def classify_file(filepath, categories):
-    for cat_name, cat_def in categories.items():
-        for pattern in cat_def["pattern"]:
-            if pattern in filepath:
-                return cat_name
-    return "code"
+    return get_classifier(categories)(filepath)
 
 def dominant_category(files, categories):
     if not files: return "code"
-    cats = [classify_file(f, categories) for f in files]
-    counter = Counter(cats)
+    classify = get_classifier(categories)
+    PROFILER.count("classify_calls", len(files))
+    counter = Counter(classify(f) for f in files)
     return counter.most_common(1)[0][0]
 
 def calc_intensity(commit_count, insertions, deletions, file_count):
@@ -141,11 +430,280 @@ def calc_intensity(commit_count, insertions, deletions, file_count):
     i3 = min(1.0, file_count / 15) * 0.2
     return round(i1 + i2 + i3, 3)
 
-def build_session_json(sessions, repo_name, categories):
-    result = []
-    for idx, session_commits in enumerate(sessions):
-        start_dt = session_commits[0]["datetime"]
-        end_dt = session_commits[-1]["datetime"]
+# ---------------------------------------------------------------------------
+# Commit cache — パース済みコミットを (repo, hash) で SQLite に保持する
+# ---------------------------------------------------------------------------
+
+COMMIT_CACHE_VERSION = 3  # 列を変えたら上げる（古いキャッシュは作り直す）
+COMMIT_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    repo TEXT NOT NULL, hash TEXT NOT NULL, seq INTEGER NOT NULL,
+    datetime TEXT NOT NULL, authored INTEGER NOT NULL, committed INTEGER NOT NULL,
+    message TEXT NOT NULL, author TEXT NOT NULL,
+    parents TEXT NOT NULL, files TEXT NOT NULL, insertions INTEGER NOT NULL, deletions INTEGER NOT NULL,
+    PRIMARY KEY (repo, hash)
+);
+CREATE INDEX IF NOT EXISTS commits_repo_seq ON commits (repo, seq);
+CREATE TABLE IF NOT EXISTS heads (repo TEXT PRIMARY KEY, head TEXT NOT NULL);
+"""
+
+def open_commit_cache(cache_path):
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(cache_path), timeout=60)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != COMMIT_CACHE_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS commits; DROP TABLE IF EXISTS heads;")
+        conn.execute(f"PRAGMA user_version = {COMMIT_CACHE_VERSION}")
+    conn.executescript(COMMIT_CACHE_SCHEMA)
+    return conn
+
+def git_head(repo_path):
+    cmd = ["git", "-C", str(Path(repo_path).expanduser()), "rev-parse", "HEAD"]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+def git_log_order(commits, head):
+    """git log（--topo-order などを付けない既定の順）と同じ hash 列。新しい順
+
+    git と同じく HEAD から辿り、見つかったコミットのうちコミット日時が最も新しいもの
+    （同時刻なら先に見つかったもの）から出していく。
+    """
+    by_hash = {c["hash"]: c for c in commits}
+    if head not in by_hash:
+        return []
+    order, seen, found = [], {head}, 0
+    queue = [(-by_hash[head]["committed"], found, head)]
+    while queue:
+        commit = by_hash[heapq.heappop(queue)[2]]
+        order.append(commit["hash"])
+        for parent in commit["parents"]:
+            if parent in by_hash and parent not in seen:
+                seen.add(parent)
+                found += 1
+                heapq.heappush(queue, (-by_hash[parent]["committed"], found, parent))
+    return order
+
+def refresh_commit_cache(conn, repo_key, repo_path, backend="git"):
+    """キャッシュを HEAD まで追従させる。既知の HEAD が祖先なら差分だけ git log する
+
+    git の走査はトランザクションの外で済ませ、書き込みだけを短い BEGIN IMMEDIATE で行う
+    （走査の間、他のリポジトリの書き込みを待たせない）。
+    """
+    ops = LOG_BACKENDS[backend]
+    head = ops["head"](repo_path)
+    if head is None:
+        print(f"  ✗ HEAD を解決できない: {repo_path}", file=sys.stderr)
+        return
+    row = conn.execute("SELECT head FROM heads WHERE repo = ?", (repo_key,)).fetchone()
+    cached_head = row[0] if row else None
+    if cached_head == head:
+        return
+    append = bool(cached_head) and ops["is_ancestor"](repo_path, cached_head)
+    commits = list(ops["log"](repo_path, rev_range=f"{cached_head}..HEAD" if append else None))
+    # 差分にマージがあると、取り込んだ枝のコミットは git log の順で既存コミットの間に入る。
+    # そのときは全体の順を git と同じ規則で付け直す（直線の追加なら既存の末尾に続くだけ）
+    reorder = None
+    if append and any(len(c["parents"]) > 1 for c in commits):
+        graph = [{"hash": h, "parents": parents.split(), "committed": committed} for h, parents, committed
+                 in conn.execute("SELECT hash, parents, committed FROM commits WHERE repo = ?", (repo_key,))]
+        reorder = {h: seq for seq, h in enumerate(reversed(git_log_order(graph + commits, head)))}
+
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT head FROM heads WHERE repo = ?", (repo_key,)).fetchone()
+        if (row[0] if row else None) != cached_head:
+            return  # 走査中に別のプロセスが更新した
+        if not append:
+            conn.execute("DELETE FROM commits WHERE repo = ?", (repo_key,))
+            seq = 0
+        else:
+            seq = conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM commits WHERE repo = ?", (repo_key,)).fetchone()[0]
+        if reorder:
+            conn.executemany("UPDATE commits SET seq = ? WHERE repo = ? AND hash = ?",
+                             ((s, repo_key, h) for h, s in reorder.items()))
+        conn.executemany(
+            "INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((repo_key, c["hash"], reorder[c["hash"]] if reorder else seq + i, c["datetime"], c["authored"],
+              c["committed"],
+              c["message"], c["author"], " ".join(c["parents"]), json.dumps(c["files"], ensure_ascii=False),
+              c["insertions"], c["deletions"])
+             for i, c in enumerate(commits)))
+        conn.execute("INSERT OR REPLACE INTO heads VALUES (?, ?)", (repo_key, head))
+
+SINCE_RELATIVE_RE = re.compile(r"^(\d+)[\s.]+(second|minute|hour|day|week|month|year)s?(?:[\s.]+ago)?$")
+SINCE_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400}
+
+def shift_months(dt, months):
+    """暦の上で months か月前（月末は丸める）。git の approxidate と同じく時刻はそのまま"""
+    month_index = dt.year * 12 + dt.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    next_month = datetime(year + month // 12, month % 12 + 1, 1)
+    last_day = (next_month - timedelta(days=1)).day
+    return dt.replace(year=year, month=month, day=min(dt.day, last_day))
+
+def parse_since(since, now=None):
+    """--since を git を使わずに epoch 秒へ変換する（解釈できなければ None）
+
+    YYYY-MM-DD（時刻は git と同じく現在時刻）、ISO 8601 の日時、「N days ago」「2.weeks.ago」、
+    yesterday / today / now に対応する。
+    """
+    now = now or datetime.now()
+    text = since.strip().lower()
+    if text in ("now", "today"):
+        return int(now.timestamp())
+    if text == "yesterday":
+        return int((now - timedelta(days=1)).timestamp())
+    match = SINCE_RELATIVE_RE.match(text)
+    if match:
+        n, unit = int(match.group(1)), match.group(2)
+        if unit in SINCE_SECONDS:
+            return int((now - timedelta(seconds=n * SINCE_SECONDS[unit])).timestamp())
+        return int(shift_months(now, n * (12 if unit == "year" else 1)).timestamp())
+    try:
+        dt = datetime.fromisoformat(since.strip())
+    except ValueError:
+        return None
+    if len(since.strip()) == 10:  # 日付だけなら現在の時刻を使う（approxidate と同じ）
+        dt = dt.replace(hour=now.hour, minute=now.minute, second=now.second)
+    return int(dt.timestamp())
+
+def resolve_since(since, repo_path=None):
+    """--since を epoch 秒に変換する。キャッシュ・pygit2 の絞り込み用
+
+    repo_path があれば git rev-parse で git と同じ解釈（approxidate）にし、
+    使えないとき（cache-only やチェックアウトが無いとき）は parse_since で解釈する。
+    """
+    if repo_path is not None:
+        cmd = ["git", "-C", str(Path(repo_path).expanduser()), "rev-parse", f"--since={since}"]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode == 0 and result.stdout.startswith("--max-age="):
+            return int(result.stdout.strip().split("=", 1)[1])
+    since_ts = parse_since(since)
+    if since_ts is None:
+        raise ValueError(f"--since を解釈できない: {since}")
+    return since_ts
+
+LOG_BACKENDS = {
+    "git": {"log": get_git_log, "head": git_head, "is_ancestor": is_ancestor},
+    "pygit2": {"log": get_pygit2_log, "head": pygit2_head, "is_ancestor": pygit2_is_ancestor},
+}
+
+def read_log(repo_path, since=None, rev_range=None, backend="git"):
+    return LOG_BACKENDS[backend]["log"](repo_path, since=since, rev_range=rev_range)
+
+def has_cached_commit(conn, repo_key, commit_hash):
+    row = conn.execute("SELECT 1 FROM commits WHERE repo = ? AND hash = ?", (repo_key, commit_hash)).fetchone()
+    return row is not None
+
+def since_reachable(commits, head, since_ts):
+    """git log --since が返すコミットの hash 集合
+
+    git は HEAD から辿り、コミット日時が since_ts より古いコミットに当たるとその先の親を辿らない
+    （--since-as-filter ではない）。日時が前後した履歴では、古いコミットの後ろにある新しいコミットは含まれない。
+    """
+    by_hash = {c["hash"]: c for c in commits}
+    keep, stack = set(), [head]
+    while stack:
+        commit = by_hash.get(stack.pop())
+        if commit is None or commit["hash"] in keep or commit["committed"] < since_ts:
+            continue
+        keep.add(commit["hash"])
+        stack.extend(commit["parents"])
+    return keep
+
+def iter_cached_commits(conn, repo_key, since_ts=None, after=None):
+    """キャッシュから git log --reverse と同じ順でコミットを返す
+
+    since_ts は git log --since 相当（since_reachable と同じく HEAD から辿れる範囲だけ）、
+    after は `after..HEAD` 相当（after から辿れるコミットを除く）。
+    """
+    query = ("SELECT hash, datetime, authored, committed, message, author, parents, files, insertions, deletions"
+             " FROM commits WHERE repo = ?")
+    params = [repo_key]
+    if since_ts is not None and not after:
+        query += " AND committed >= ?"
+        params.append(since_ts)
+    query += " ORDER BY seq"
+    commits = ({"hash": row[0], "datetime": row[1], "authored": row[2], "committed": row[3], "message": row[4],
+                "author": row[5], "parents": row[6].split(), "files": json.loads(row[7]), "insertions": row[8],
+                "deletions": row[9]}
+               for row in conn.execute(query, params))
+    if since_ts is None and not after:
+        yield from commits
+        return
+    commits = list(commits)
+    if after:
+        # マージで取り込んだ枝には after より古いコミットもあるので、順番ではなく到達可能性で除く
+        seen = since_reachable(commits, after, 0)  # 時刻では打ち切らない
+        commits = [c for c in commits if c["hash"] not in seen]
+    if since_ts is None:
+        yield from commits
+        return
+    row = conn.execute("SELECT head FROM heads WHERE repo = ?", (repo_key,)).fetchone()
+    head = row[0] if row else (commits[-1]["hash"] if commits else None)
+    keep = since_reachable(commits, head, since_ts)
+    yield from (c for c in commits if c["hash"] in keep)
+
+def fetch_repo_sessions(repo_path, gap_hours, cursor=None, since=None, columnar=False,
+                        cache_path=None, cache_only=False, backend="git"):
+    """1リポジトリ分の git 走査とセッション分割。スレッドプールから呼ばれる
+
+    cache_path があればコミットはキャッシュから読み、git は HEAD の差分取得にだけ使う
+    （cache_only なら git を一切呼ばない）。
+
+    Returns: (実際に使ったカーソル or None, セッション分割済みコミット列, 列指向の集計値 or None)
+    """
+    if cache_path:
+        repo_key = str(Path(repo_path).expanduser().resolve())
+        try:
+            conn = open_commit_cache(cache_path)
+            try:
+                if not cache_only:
+                    with PROFILER.stage("cache_refresh", repo=repo_key):
+                        try:
+                            refresh_commit_cache(conn, repo_key, repo_path, backend=backend)
+                        except (GitLogError, sqlite3.Error) as e:
+                            # 書き込みは巻き戻っている（heads も更新されない）ので、次回また差分を取りに行く
+                            print(f"  ✗ {e}（キャッシュは更新せず、既存の内容で集計）", file=sys.stderr)
+                if cursor and not has_cached_commit(conn, repo_key, cursor):
+                    cursor = None
+                since_ts = None
+                if since and not cursor:
+                    since_ts = resolve_since(since, None if cache_only else repo_path)
+                with PROFILER.stage("cache_read", repo=repo_key):
+                    commits = list(iter_cached_commits(conn, repo_key, since_ts=since_ts, after=cursor))
+                PROFILER.count("cache_commits_read", len(commits))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"  ✗ コミットキャッシュを読めない: {e}", file=sys.stderr)
+            commits = []
+    else:
+        if cursor and not LOG_BACKENDS[backend]["is_ancestor"](repo_path, cursor):
+            cursor = None
+        try:
+            if cursor:
+                commits = list(read_log(repo_path, rev_range=f"{cursor}..HEAD", backend=backend))
+            else:
+                commits = list(read_log(repo_path, since=since, backend=backend))
+        except GitLogError as e:
+            print(f"  ✗ {e}", file=sys.stderr)
+            commits = []
+    with PROFILER.stage("split_sessions", repo=str(repo_path), columnar=columnar):
+        if columnar:
+            return (cursor, *split_sessions_columnar(commits, gap_hours))
+        return cursor, split_sessions(commits, gap_hours), None
+
+def build_session(session_commits, session_id, repo_name, categories, totals=None):
+    start_dt = session_commits[0]["datetime"]
+    end_dt = session_commits[-1]["datetime"]
+    if totals:
+        duration_min = totals["duration_min"]
+        total_ins = totals["insertions"]
+        total_dels = totals["deletions"]
+        unique_files = sorted({f for c in session_commits for f in c.get("files", [])})
+    else:
         t0 = datetime.fromisoformat(start_dt)
         t1 = datetime.fromisoformat(end_dt)
         duration_min = max(1, int((t1 - t0).total_seconds() / 60))
@@ -157,29 +715,194 @@ def build_session_json(sessions, repo_name, categories):
             total_ins += c.get("insertions", 0)
             total_dels += c.get("deletions", 0)
         unique_files = sorted(set(all_files))
-        messages = [c["message"] for c in session_commits]
-        dom_cat = dominant_category(unique_files, categories)
-        intensity = calc_intensity(len(session_commits), total_ins, total_dels, len(unique_files))
-        session_id = f"{repo_name[:2]}{idx + 1:03d}"
-        result.append({
-            "id": session_id, "repo": repo_name,
-            "start": start_dt, "end": end_dt, "duration_min": duration_min,
-            "commit_count": len(session_commits), "files_changed": unique_files,
-            "insertions": total_ins, "deletions": total_dels,
-            "dominant_category": dom_cat,
-            "color": categories.get(dom_cat, {}).get("color", "#94a3b8"),
-            "messages": messages, "intensity": intensity, "texture_url": None
+    messages = [c["message"] for c in session_commits]
+    dom_cat = dominant_category(unique_files, categories)
+    intensity = calc_intensity(len(session_commits), total_ins, total_dels, len(unique_files))
+    return {
+        "id": session_id, "repo": repo_name,
+        "start": start_dt, "end": end_dt, "duration_min": duration_min,
+        "commit_count": len(session_commits), "files_changed": unique_files,
+        "insertions": total_ins, "deletions": total_dels,
+        "dominant_category": dom_cat,
+        "color": categories.get(dom_cat, {}).get("color", "#94a3b8"),
+        "messages": messages, "intensity": intensity, "texture_url": None
+    }
+
+def build_session_json(sessions, repo_name, categories, start_index=0, totals=None):
+    return [
+        build_session(session_commits, f"{repo_name[:2]}{start_index + idx + 1:03d}", repo_name, categories,
+                      totals[idx] if totals else None)
+        for idx, session_commits in enumerate(sessions)
+    ]
+
+def merge_into_session(session, commits, categories):
+    """集計済みセッションに後続コミットを足し込む。手動で追加したフィールドは保持する"""
+    files = set(session.get("files_changed", []))
+    total_ins = session.get("insertions", 0)
+    total_dels = session.get("deletions", 0)
+    for c in commits:
+        files.update(c.get("files", []))
+        total_ins += c.get("insertions", 0)
+        total_dels += c.get("deletions", 0)
+    unique_files = sorted(files)
+    commit_count = session.get("commit_count", 0) + len(commits)
+    end_dt = commits[-1]["datetime"]
+    t0 = datetime.fromisoformat(session["start"])
+    t1 = datetime.fromisoformat(end_dt)
+    dom_cat = dominant_category(unique_files, categories)
+    session.update({
+        "end": end_dt, "duration_min": max(1, int((t1 - t0).total_seconds() / 60)),
+        "commit_count": commit_count, "files_changed": unique_files,
+        "insertions": total_ins, "deletions": total_dels,
+        "dominant_category": dom_cat,
+        "color": categories.get(dom_cat, {}).get("color", "#94a3b8"),
+        "messages": session.get("messages", []) + [c["message"] for c in commits],
+        "intensity": calc_intensity(commit_count, total_ins, total_dels, len(unique_files)),
+    })
+    return session
+
+def carry_manual_fields(sessions, previous):
+    """作り直したセッションに、同じ id の既存エントリから手動フィールドを引き継ぐ
+
+    生成しないフィールド（cover, title_ja 等）と、生成側が None で置くフィールド（texture_url）が対象。
+    Returns: 引き継いだエントリ数
+    """
+    carried = 0
+    for session in sessions:
+        old = previous.get(session["id"])
+        if old is None: continue
+        manual = {k: v for k, v in old.items() if session.get(k) is None and v is not None}
+        if manual:
+            session.update(manual)
+            carried += 1
+    return carried
+
+# ---------------------------------------------------------------------------
+# Output — sessions.json を1セッションずつ書き出す / 分割出力
+# ---------------------------------------------------------------------------
+
+def session_sort_key(session):
+    return session.get("start", session.get("end", ""))
+
+def write_json_array(fp, items):
+    """json.dumps(items, indent=2, ensure_ascii=False) と同一の内容を要素ごとに書き出す
+
+    Returns: 書き出した要素数
+    """
+    count = 0
+    for item in items:
+        fp.write("[\n  " if count == 0 else ",\n  ")
+        fp.write(json.dumps(item, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+        count += 1
+    fp.write("\n]" if count else "[]")
+    return count
+
+def write_json_array_file(path, items):
+    """一時ファイルに書いてから置き換える（途中で落ちても既存ファイルを壊さない）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as fp:
+        count = write_json_array(fp, items)
+    os.replace(tmp_path, path)
+    return count
+
+def iter_shards(sessions, shard_by, page_size=DEFAULT_PAGE_SIZE):
+    """ソート済みセッションを (シャード名, セッション列) に分ける
+
+    shard_by="month" は開始日時の YYYY-MM、"page" は page_size 件ごと。
+    """
+    if shard_by == "month":
+        shards = {}
+        for session in sessions:
+            shards.setdefault(session_sort_key(session)[:7] or "unknown", []).append(session)
+        yield from shards.items()
+    else:
+        for i in range(0, len(sessions), page_size):
+            yield f"page-{i // page_size + 1:03d}", sessions[i:i + page_size]
+
+def write_shards(output_path, sessions, shard_by, page_size=DEFAULT_PAGE_SIZE):
+    """<output の stem>/ 以下にシャードと index.json（マニフェスト）を書き出す
+
+    フロントエンドは index.json を読み、表示する範囲のシャードだけ取得すればよい。
+    """
+    shard_dir = output_path.parent / output_path.stem
+    index_path = shard_dir / "index.json"
+    if index_path.exists():
+        with open(index_path) as f:
+            previous = json.load(f)
+        for shard in previous.get("shards", []):
+            (output_path.parent / shard["file"]).unlink(missing_ok=True)
+
+    shards = []
+    for name, items in iter_shards(sessions, shard_by, page_size):
+        shard_path = shard_dir / f"{name}.json"
+        write_json_array_file(shard_path, items)
+        shards.append({
+            "name": name,
+            "file": shard_path.relative_to(output_path.parent).as_posix(),
+            "count": len(items),
+            "first": session_sort_key(items[0]),
+            "last": session_sort_key(items[-1]),
         })
-    return result
+    index = {"shard_by": shard_by, "total": len(sessions), "shards": shards}
+    if shard_by == "page":
+        index["page_size"] = page_size
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    index_path.write_text(json.dumps(index, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return index_path, len(shards)
 
 def main():
     parser = argparse.ArgumentParser(description="git log → sessions.json")
     parser.add_argument("--repo", help="対象リポジトリ名")
     parser.add_argument("--path", help="リポジトリのローカルパス（CI用。configのlocal_pathを上書き）")
-    parser.add_argument("--since", help="開始日 (YYYY-MM-DD)")
+    parser.add_argument("--since", help="開始日 (YYYY-MM-DD、git の --since と同じ書式)")
     parser.add_argument("--dry-run", action="store_true", help="標準出力のみ")
     parser.add_argument("--output", help="出力先パス")
+    parser.add_argument("--incremental", action="store_true", help="前回カーソル以降のコミットのみ取り込み、既存sessions.jsonへマージ")
+    parser.add_argument("--state", help="カーソル状態ファイルのパス")
+    parser.add_argument("--columnar", action="store_true", help="numpy でセッション分割・集計を行う（要 numpy）")
+    parser.add_argument("--cache", action="store_true", help="パース済みコミットを SQLite キャッシュから読む（HEAD の差分だけ git log）")
+    parser.add_argument("--cache-only", action="store_true", help="git を呼ばずキャッシュだけで集計（--cache を含む）")
+    parser.add_argument("--shard", choices=["month", "page"], help="sessions.json に加えて月別 / ページ別の分割ファイルと index.json を出力")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="--shard page の1ファイルあたり件数")
+    parser.add_argument("--backend", choices=sorted(LOG_BACKENDS), default="git", help="コミットの読み出し方法（pygit2 は要 pygit2）")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="並列に走査するリポジトリ数（0 = リポジトリ数）")
+    parser.add_argument("--profile", action="store_true", help="ステージ別の時間・カウンタを標準エラーに表示")
+    parser.add_argument("--profile-out", help="プロファイル出力先（.json = Chrome trace、それ以外 = cProfile の pstats）")
     args = parser.parse_args()
+    if args.backend == "pygit2" and pygit2 is None:
+        parser.error("--backend pygit2 には pygit2 が必要です")
+    if args.page_size < 1:
+        parser.error(f"--page-size は 1 以上: {args.page_size}")
+    if args.cache_only and args.since and parse_since(args.since) is None:
+        parser.error(f"--cache-only では --since を解釈できない: {args.since}"
+                     "（YYYY-MM-DD、ISO 8601 の日時、「2 weeks ago」などで指定）")
+
+    PROFILER.enabled = args.profile or bool(args.profile_out)
+    # cProfile はメインスレッドしか見えないので、その場合はリポジトリ走査も直列で行う
+    profile = cProfile.Profile() if args.profile_out and not args.profile_out.endswith(".json") else None
+    if profile:
+        profile.enable()
+    try:
+        run(args, serial=profile is not None)
+    finally:
+        if profile:
+            profile.disable()
+            profile.dump_stats(args.profile_out)
+        if PROFILER.enabled:
+            for _, classify in _CLASSIFIERS.values():
+                PROFILER.count("classify_cache_misses", len(classify.cache))
+            PROFILER.counters["classify_cache_hits"] = (
+                PROFILER.counters["classify_calls"] - PROFILER.counters["classify_cache_misses"])
+            print(PROFILER.summary(), file=sys.stderr)
+            if args.profile_out and args.profile_out.endswith(".json"):
+                Path(args.profile_out).write_text(json.dumps(PROFILER.chrome_trace(), indent=2), encoding="utf-8")
+            if args.profile_out:
+                print(f"✓ profile → {args.profile_out}", file=sys.stderr)
+
+def run(args, serial=False):
+    use_cache = args.cache or args.cache_only
 
     config = load_config()
     categories = config.get("categories", DEFAULT_CATEGORIES) or DEFAULT_CATEGORIES
@@ -206,35 +929,95 @@ def main():
         print("✗ approved_repos が空です。--path か --repo を指定してください。", file=sys.stderr)
         sys.exit(1)
 
-    all_sessions = []
+    output_path = Path(args.output or str(PROJECT_ROOT / config.get("output_path", "assets/devlog/sessions.json")))
+    state_path = Path(args.state or str(PROJECT_ROOT / config.get("state_path", DEFAULT_STATE_PATH)))
+    state = load_state(state_path)
+    gap = timedelta(hours=gap_hours)
+    cache_path = PROJECT_ROOT / config.get("commit_cache_path", DEFAULT_COMMIT_CACHE_PATH) if use_cache else None
+
+    # incremental: 既存エントリ（手動管理フィールド含む）はそのまま残し、変化したセッションだけ書き換える
+    all_sessions = load_existing_sessions(output_path) if args.incremental else []
+    pending = []
     for repo_def in targets:
         repo_name = repo_def["name"]
-        print(f"\n--- {repo_name} ---", file=sys.stderr)
         approved = check_approval(repo_name, config, repo_def)
         if not approved: continue
         if "read_log" not in approved.get("permissions", []):
-            print(f"  ✗ read_log 権限なし", file=sys.stderr)
+            print(f"  ✗ {repo_name}: read_log 権限なし", file=sys.stderr)
             continue
         repo_path = args.path if args.path else repo_def["local_path"]
-        commits = get_git_log(repo_path, since=args.since)
-        print(f"  コミット数: {len(commits)}", file=sys.stderr)
-        if not commits: continue
-        sessions = split_sessions(commits, gap_hours)
+        cursor = state["repos"].get(repo_name, {}).get("cursor") if args.incremental else None
+        pending.append((repo_name, repo_path, cursor))
+
+    columnar = args.columnar and np is not None
+    if args.columnar and not columnar:
+        print("  ⚠ numpy が見つからないため --columnar を無視して通常経路で処理", file=sys.stderr)
+
+    # git の走査だけを並列化し、マージ・ID採番は targets の順に直列で行う（出力は直列実行と同一）
+    def fetch(job):
+        return fetch_repo_sessions(job[1], gap_hours, cursor=job[2], since=args.since, columnar=columnar,
+                                   cache_path=cache_path, cache_only=args.cache_only, backend=args.backend)
+
+    workers = 1 if serial else max(1, min(args.jobs or len(pending), len(pending)))
+    with PROFILER.stage("ingest", repos=len(pending), workers=workers):
+        if workers == 1:
+            fetched = [fetch(job) for job in pending]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                fetched = list(pool.map(fetch, pending))
+
+    changed = 0
+    for (repo_name, _, requested_cursor), (cursor, sessions, totals) in zip(pending, fetched):
+        print(f"\n--- {repo_name} ---", file=sys.stderr)
+        if requested_cursor and not cursor:
+            print(f"  ⚠ カーソル {requested_cursor[:7]} が履歴にない。全履歴から再生成", file=sys.stderr)
+        elif cursor:
+            print(f"  カーソル: {cursor[:7]}..HEAD", file=sys.stderr)
+        print(f"  コミット数: {sum(len(s) for s in sessions)}", file=sys.stderr)
+        if not sessions: continue
+        # カーソルなしの incremental は全履歴から作り直す。手動フィールドは同じ id のエントリから引き継ぐ
+        previous = {}
+        if args.incremental and not cursor:
+            previous = {s["id"]: s for s in all_sessions if s.get("repo") == repo_name and "id" in s}
+            all_sessions = [s for s in all_sessions if s.get("repo") != repo_name]
+        repo_sessions = [s for s in all_sessions if s.get("repo") == repo_name]
+        last_hash = sessions[-1][-1]["hash"]
+
+        if cursor and repo_sessions:
+            trailing = max(repo_sessions, key=lambda s: datetime.fromisoformat(s["end"]))
+            first_dt = datetime.fromisoformat(sessions[0][0]["datetime"])
+            if first_dt - datetime.fromisoformat(trailing["end"]) <= gap:
+                merge_into_session(trailing, sessions.pop(0), categories)
+                if totals: totals.pop(0)
+                changed += 1
+                print(f"  末尾セッション {trailing['id']} に追記", file=sys.stderr)
         print(f"  セッション数: {len(sessions)}", file=sys.stderr)
-        session_jsons = build_session_json(sessions, repo_name, categories)
+        with PROFILER.stage("build_session_json", repo=repo_name, sessions=len(sessions)):
+            session_jsons = build_session_json(sessions, repo_name, categories, start_index=len(repo_sessions),
+                                               totals=totals)
+        if previous:
+            carried = carry_manual_fields(session_jsons, previous)
+            print(f"  手動フィールドを引き継ぎ: {carried}/{len(previous)} エントリ", file=sys.stderr)
         all_sessions.extend(session_jsons)
+        changed += len(session_jsons)
+        state["repos"][repo_name] = {"cursor": last_hash}
 
-    all_sessions.sort(key=lambda s: s["start"], reverse=True)
-    output_json = json.dumps(all_sessions, indent=2, ensure_ascii=False)
+    all_sessions.sort(key=session_sort_key, reverse=True)
 
     if args.dry_run:
-        print(output_json)
+        with PROFILER.stage("write_json", target="stdout"):
+            write_json_array(sys.stdout, all_sessions)
+            print()
     else:
-        output_path = args.output or str(PROJECT_ROOT / config.get("output_path", "assets/devlog/sessions.json"))
-        output_path = Path(output_path)
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        output_path.write_text(output_json, encoding="utf-8")
-        print(f"\n✓ {len(all_sessions)} sessions → {output_path}", file=sys.stderr)
+        with PROFILER.stage("write_json", target=str(output_path)):
+            write_json_array_file(output_path, all_sessions)
+        PROFILER.count("json_bytes_written", output_path.stat().st_size)
+        save_state(state_path, state)
+        print(f"\n✓ {len(all_sessions)} sessions ({changed} updated) → {output_path}", file=sys.stderr)
+        if args.shard:
+            with PROFILER.stage("write_shards", shard_by=args.shard):
+                index_path, shard_count = write_shards(output_path, all_sessions, args.shard, args.page_size)
+            print(f"✓ {shard_count} shards ({args.shard}) → {index_path}", file=sys.stderr)
 
 if __name__ == "__main__":
     main()